@@ -19,6 +19,8 @@ class ServerConfig:
     debug: bool = False
     cors_origins: list[str] = field(default_factory=lambda: ["*"])
     shutdown_timeout: int = 10  # seconds
+    # Worker threads handling HTTP connections concurrently
+    http_threads: int = min(32, (os.cpu_count() or 1) * 2 + 4)
 
 
 @dataclass
@@ -34,9 +36,14 @@ class LLMConfig:
     top_k: int = 40
     system_prompt: str = "You are a helpful AI assistant."
     n_ctx: int = 4096
-    n_threads: int = 8
-    n_gpu_layers: int = 0
+    n_threads: Optional[int] = None  # None: half the logical CPUs
+    n_gpu_layers: Optional[int] = None  # None: all layers if llama_cpp has GPU support
     n_batch: int = 512
+    n_draft: int = 0  # speculative draft tokens per step; 0 disables
+    use_mmap: bool = True
+    use_mlock: bool = False  # pin model pages in RAM
+    numa: Optional[bool] = None  # None: enable on multi-node machines
+    prompt_cache_bytes: int = 0  # llama_cpp prompt state cache size; 0 disables
     stop: list[str] = field(default_factory=lambda: ["<|im_start|>", "<|im_end|>"])
 
 
@@ -120,6 +127,8 @@ def _load_yaml_config(config: Config, config_dict: dict) -> None:
             config.server.cors_origins = server_dict["cors_origins"]
         if "shutdown_timeout" in server_dict:
             config.server.shutdown_timeout = server_dict["shutdown_timeout"]
+        if "http_threads" in server_dict:
+            config.server.http_threads = server_dict["http_threads"]
 
     # LLM configuration
     if "llm" in config_dict:
@@ -150,6 +159,16 @@ def _load_yaml_config(config: Config, config_dict: dict) -> None:
             config.llm.n_gpu_layers = llm_dict["n_gpu_layers"]
         if "n_batch" in llm_dict:
             config.llm.n_batch = llm_dict["n_batch"]
+        if "n_draft" in llm_dict:
+            config.llm.n_draft = llm_dict["n_draft"]
+        if "use_mmap" in llm_dict:
+            config.llm.use_mmap = llm_dict["use_mmap"]
+        if "use_mlock" in llm_dict:
+            config.llm.use_mlock = llm_dict["use_mlock"]
+        if "numa" in llm_dict:
+            config.llm.numa = llm_dict["numa"]
+        if "prompt_cache_bytes" in llm_dict:
+            config.llm.prompt_cache_bytes = llm_dict["prompt_cache_bytes"]
         if "stop" in llm_dict:
             config.llm.stop = llm_dict["stop"]
 
@@ -224,6 +243,7 @@ def load_config(config_path: Optional[Path] = None) -> Config:
     config.server.shutdown_timeout = _get_env_int(
         "SHUTDOWN_TIMEOUT", config.server.shutdown_timeout
     )
+    config.server.http_threads = _get_env_int("HTTP_THREADS", config.server.http_threads)
 
     # LLM configuration
     config.llm.provider = os.environ.get("LLM_PROVIDER", config.llm.provider)
@@ -241,6 +261,13 @@ def load_config(config_path: Optional[Path] = None) -> Config:
     config.llm.n_threads = _get_env_int("LLM_N_THREADS", config.llm.n_threads)
     config.llm.n_gpu_layers = _get_env_int("LLM_N_GPU_LAYERS", config.llm.n_gpu_layers)
     config.llm.n_batch = _get_env_int("LLM_N_BATCH", config.llm.n_batch)
+    config.llm.n_draft = _get_env_int("LLM_N_DRAFT", config.llm.n_draft)
+    config.llm.use_mmap = _get_env_bool("LLM_USE_MMAP", config.llm.use_mmap)
+    config.llm.use_mlock = _get_env_bool("LLM_USE_MLOCK", config.llm.use_mlock)
+    config.llm.numa = _get_env_bool("LLM_NUMA", config.llm.numa)
+    config.llm.prompt_cache_bytes = _get_env_int(
+        "LLM_PROMPT_CACHE_BYTES", config.llm.prompt_cache_bytes
+    )
     config.llm.stop = _get_env_list("LLM_STOP", config.llm.stop)
 
     # Database configuration
@@ -11,7 +11,8 @@ Design follows Requirements 6.2, 6.3 and Property 6 (Context Window Compliance).
 
 import logging
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any
+from itertools import accumulate
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 
 from .token_estimator import TokenEstimator
@@ -39,12 +40,12 @@ class ContextBuilderConfig:
     response_reserve_tokens: int = 1024
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     """A conversation message."""
     role: str  # 'system', 'user', 'assistant'
     content: str
-    token_count: int = 0
+    token_count: int = 0  # Estimated content tokens; 0 until counted
     created_at: float = 0.0
     attachments: List[Dict[str, Any]] = field(default_factory=list)
 
@@ -68,7 +69,7 @@ class Message:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationContext:
     """A constructed conversation context for LLM requests."""
     messages: List[Message]
@@ -156,6 +157,9 @@ class ContextBuilder:
         self.token_estimator = token_estimator or TokenEstimator()
         self._llm_provider = llm_provider
         self._summarization_cache: Dict[str, str] = {}
+        # (system prompt, its token count with formatting) from the last build;
+        # a chat sends the same prompt every turn
+        self._system_tokens_cache: Optional[Tuple[str, int]] = None
 
     def set_llm_provider(self, provider: LLMProvider) -> None:
         """Set the LLM provider for summarization.
@@ -175,15 +179,20 @@ class ContextBuilder:
         Returns:
             Token count including ChatML formatting
         """
-        # Count the content tokens
-        content_tokens = self.token_estimator.count_tokens(
-            message.content, model
-        )
+        # Count the content tokens, reusing the count stored on the message
+        # (stored messages carry it from when they were saved) and storing it
+        # back otherwise, so later builds skip unchanged messages
+        content_tokens = message.token_count
+        if not content_tokens:
+            content_tokens = self.token_estimator.count_tokens(
+                message.content or "", model
+            )
+            message.token_count = content_tokens
 
         # Add formatting tokens for ChatML
         # Format: <|im_start|>role\ncontent<|im_end|>\n
         format_tokens = 3  # <|im_start|>, \n, <|im_end|>
-        role_tokens = self.token_estimator.count_tokens(message.role, model)
+        role_tokens = self.token_estimator.count_role_tokens(message.role, model)
 
         return content_tokens + role_tokens + format_tokens
 
@@ -199,12 +208,8 @@ class ContextBuilder:
         Returns:
             Total token count
         """
-        total = 0
-
-        # Count system prompt tokens
-        if system_prompt:
-            total += self.token_estimator.count_tokens(system_prompt)
-            total += 3  # System message formatting
+        # Count system prompt tokens (with system message formatting)
+        total = self._count_system_tokens(system_prompt)
 
         # Count each message
         for message in messages:
@@ -227,7 +232,10 @@ class ContextBuilder:
         4. If still over limit, uses summarization
 
         Args:
-            messages: List of conversation messages (oldest to newest)
+            messages: List of conversation messages (oldest to newest). Any
+                object exposing ``role`` and ``content`` attributes is
+                accepted, so stored ``database.Message`` rows can be passed
+                directly without converting them first.
             system_prompt: Optional system prompt to include
             model: The model for token encoding
 
@@ -236,8 +244,11 @@ class ContextBuilder:
         """
         max_tokens = self.config.max_context_tokens - self.config.response_reserve_tokens
 
-        # Count current tokens
-        total_tokens = self.count_context_tokens(messages, system_prompt)
+        # Count each message once; the window and summarization steps select
+        # from this column of counts instead of re-counting messages
+        token_counts = [self.count_message_tokens(message, model) for message in messages]
+        system_tokens = self._count_system_tokens(system_prompt)
+        total_tokens = system_tokens + sum(token_counts)
 
         # If within limit, return all messages
         if total_tokens <= max_tokens:
@@ -249,15 +260,17 @@ class ContextBuilder:
             )
 
         # Apply sliding window to keep most recent messages
-        windowed_messages = self._apply_sliding_window(messages, max_tokens, system_prompt, model)
+        windowed_messages = self._apply_sliding_window(
+            messages, max_tokens, system_prompt, model, token_counts
+        )
 
         # Recount tokens after sliding window
-        total_tokens = self.count_context_tokens(windowed_messages, system_prompt)
+        total_tokens = system_tokens + sum(token_counts[len(messages) - len(windowed_messages):])
 
         # If still over limit and summarization is enabled, summarize
         if total_tokens > max_tokens and self.config.enable_summarization:
             return self._build_with_summarization(
-                messages, system_prompt, model, max_tokens
+                messages, system_prompt, model, max_tokens, token_counts
             )
 
         return ConversationContext(
@@ -267,12 +280,42 @@ class ContextBuilder:
             was_summarized=False,
         )
 
+    def _count_system_tokens(self, system_prompt: Optional[str]) -> int:
+        """Count tokens for the system prompt including formatting."""
+        if not system_prompt:
+            return 0
+        cached = self._system_tokens_cache
+        if cached is not None and cached[0] == system_prompt:
+            return cached[1]
+        tokens = self.token_estimator.count_tokens(system_prompt) + 3
+        self._system_tokens_cache = (system_prompt, tokens)
+        return tokens
+
+    @staticmethod
+    def _window_start(token_counts: List[int], available_tokens: int) -> int:
+        """Find where the longest suffix of messages fitting the budget begins.
+
+        Args:
+            token_counts: Per-message token counts (oldest to newest)
+            available_tokens: Token budget for the kept messages
+
+        Returns:
+            Index of the oldest message to keep; len(token_counts) if none fit
+        """
+        kept = 0
+        for running_total in accumulate(reversed(token_counts)):
+            if running_total > available_tokens:
+                break
+            kept += 1
+        return len(token_counts) - kept
+
     def _apply_sliding_window(
         self,
         messages: List[Message],
         max_tokens: int,
         system_prompt: Optional[str],
         model: str,
+        token_counts: Optional[List[int]] = None,
     ) -> List[Message]:
         """Apply sliding window to keep most recent messages within limit.
 
@@ -281,36 +324,25 @@ class ContextBuilder:
             max_tokens: Maximum tokens allowed
             system_prompt: Optional system prompt
             model: Model for token encoding
+            token_counts: Optional precomputed per-message token counts
 
         Returns:
             Subset of messages that fit within limit
         """
-        # Reserve tokens for system prompt
-        system_tokens = 0
-        if system_prompt:
-            system_tokens = self.token_estimator.count_tokens(system_prompt) + 3
-
-        available_tokens = max_tokens - system_tokens
+        if token_counts is None:
+            token_counts = [self.count_message_tokens(message, model) for message in messages]
 
-        # Start from the newest messages and work backwards
-        result: List[Message] = []
-        current_tokens = 0
-
-        # Process messages in reverse (newest first)
-        for message in reversed(messages):
-            message_tokens = self.count_message_tokens(message, model)
+        # Reserve tokens for system prompt
+        available_tokens = max_tokens - self._count_system_tokens(system_prompt)
 
-            if current_tokens + message_tokens <= available_tokens:
-                # Add to the beginning (older in conversation)
-                result.insert(0, message)
-                current_tokens += message_tokens
-            else:
-                # Stop once we can't fit more messages
-                break
+        # Keep the newest messages whose running total fits
+        start = self._window_start(token_counts, available_tokens)
 
         # If we have too many messages, limit to the most recent ones
-        if len(result) > self.config.max_messages_before_summary:
-            result = result[-self.config.max_messages_before_summary:]
+        start = max(start, len(messages) - self.config.max_messages_before_summary)
+
+        result = messages[start:]
+        current_tokens = sum(token_counts[start:])
 
         logger.debug(
             f"Sliding window: kept {len(result)} messages, "
@@ -325,6 +357,7 @@ class ContextBuilder:
         system_prompt: Optional[str],
         model: str,
         max_tokens: int,
+        token_counts: Optional[List[int]] = None,
     ) -> ConversationContext:
         """Build context with summarization of older messages.
 
@@ -333,14 +366,16 @@ class ContextBuilder:
             system_prompt: Optional system prompt
             model: Model for token encoding
             max_tokens: Maximum tokens allowed
+            token_counts: Optional precomputed per-message token counts
 
         Returns:
             ConversationContext with summarized older messages
         """
+        if token_counts is None:
+            token_counts = [self.count_message_tokens(message, model) for message in messages]
+
         # Reserve tokens for system prompt and summary
-        system_tokens = 0
-        if system_prompt:
-            system_tokens = self.token_estimator.count_tokens(system_prompt) + 3
+        system_tokens = self._count_system_tokens(system_prompt)
 
         # Reserve tokens for the summary
         summary_reserve = self.config.min_preserved_tokens
@@ -348,20 +383,12 @@ class ContextBuilder:
         available_tokens = max_tokens - system_tokens - summary_reserve
 
         # Keep the most recent messages that fit
-        recent_messages: List[Message] = []
-        recent_tokens = 0
-
-        for message in reversed(messages):
-            message_tokens = self.count_message_tokens(message, model)
-
-            if recent_tokens + message_tokens <= available_tokens:
-                recent_messages.insert(0, message)
-                recent_tokens += message_tokens
-            else:
-                break
+        start = self._window_start(token_counts, available_tokens)
+        recent_messages = messages[start:]
+        recent_tokens = sum(token_counts[start:])
 
         # Summarize the older messages
-        older_messages = [m for m in messages if m not in recent_messages]
+        older_messages = messages[:start]
 
         summary = None
         was_summarized = False
@@ -510,6 +537,7 @@ class ContextBuilder:
                 prompt=summarization_prompt,
                 system_prompt=system_prompt or "You are a helpful assistant that summarizes conversations.",
                 config=summary_config,
+                preformatted=False,
             )
 
             summary = response.content.strip()
@@ -554,7 +582,7 @@ class ContextBuilder:
         lines = []
         for msg in messages:
             role = msg.role.upper()
-            content = msg.content[:500] if len(msg.content) > 500 else msg.content
+            content = (msg.content or "")[:500]
             lines.append(f"[{role}]: {content}")
 
         return "\n".join(lines)
@@ -572,7 +600,7 @@ class ContextBuilder:
         import hashlib
 
         content = "".join(
-            f"{m.id or m.role}:{m.content[:100]}"
+            f"{getattr(m, 'id', None) or m.role}:{(m.content or '')[:100]}"
             for m in messages
         )
         return hashlib.md5(content.encode()).hexdigest()
@@ -608,7 +636,7 @@ class ContextBuilder:
         # Add all messages
         for message in context.messages:
             role = message.role if message.role in self.CHATML_ROLES else "assistant"
-            parts.append(self.CHATML_ROLES[role].format(content=message.content))
+            parts.append(self.CHATML_ROLES[role].format(content=message.content or ""))
 
         # Add assistant start token
         parts.append("<|im_start|>assistant\n")
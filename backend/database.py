@@ -1,7 +1,9 @@
 """Database module for session persistence using sqlite3."""
+import json
 import sqlite3
 from contextlib import contextmanager
 from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 from datetime import datetime
@@ -34,6 +36,21 @@ class Message:
     token_count: Optional[int] = None
     attachments: Optional[str] = None
     created_at: Optional[float] = None
+    # Lowercased content as stored for search; only loaded by search queries
+    content_lower: Optional[str] = field(default=None, repr=False)
+
+    @cached_property
+    def attachments_parsed(self) -> Optional[list]:
+        """Attachments JSON decoded once and memoized on the instance.
+
+        Returns None when there are no attachments or the stored JSON is invalid.
+        """
+        if not self.attachments:
+            return None
+        try:
+            return json.loads(self.attachments)
+        except json.JSONDecodeError:
+            return None
 
 
 @dataclass
@@ -50,7 +67,10 @@ class Attachment:
     created_at: Optional[float] = None
 
 # Database schema version for future migrations
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 3
+
+# Names of the FTS5 message indexes present; None until checked
+_fts_indexes: Optional[set[str]] = None
 
 
 def get_connection() -> sqlite3.Connection:
@@ -139,9 +159,11 @@ def init_db() -> None:
                 token_count INTEGER,
                 attachments TEXT,
                 created_at REAL,
+                content_lower TEXT,
                 FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE
             )
         """)
+        _migrate_content_lower(cursor)
 
         # Attachments table with FK to messages
         cursor.execute("""
@@ -180,6 +202,8 @@ def init_db() -> None:
             ON attachments(content_hash)
         """)
 
+        _init_fulltext_index(cursor)
+
         # Store schema version
         cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
@@ -189,6 +213,117 @@ def init_db() -> None:
         close_connection(conn)
 
 
+def _migrate_content_lower(cursor: sqlite3.Cursor) -> None:
+    """Add and backfill messages.content_lower on databases created before it existed.
+
+    The column holds str.lower() of the content so searches compare against
+    it directly instead of lowercasing every candidate message per query.
+    It is filled in Python rather than with SQL lower(), which only folds
+    ASCII characters.
+    """
+    cursor.execute("PRAGMA table_info(messages)")
+    if any(row["name"] == "content_lower" for row in cursor.fetchall()):
+        return
+    cursor.execute("ALTER TABLE messages ADD COLUMN content_lower TEXT")
+    cursor.execute("SELECT rowid, content FROM messages WHERE content IS NOT NULL")
+    cursor.executemany(
+        "UPDATE messages SET content_lower = ? WHERE rowid = ?",
+        [(row["content"].lower(), row["rowid"]) for row in cursor.fetchall()]
+    )
+
+
+def _lower(content: Optional[str]) -> Optional[str]:
+    """Lowercased copy of message content for the content_lower column."""
+    return content.lower() if content is not None else None
+
+
+def _init_fulltext_index(cursor: sqlite3.Cursor) -> None:
+    """Create the trigram FTS5 index used to narrow message searches.
+
+    The index covers content_lower with case-sensitive trigrams, so a
+    lowercased query matches exactly the rows whose content_lower contains
+    it, the same test as the scan. Indexing the raw content instead would
+    rely on SQLite's case folding, which disagrees with str.lower() for
+    characters such as 'İ'.
+
+    It is an external-content table keyed by the messages rowid and kept in
+    sync by triggers, so inserts, edits and deletes need no extra code.
+    Existing messages are indexed when the table is created. Indexes from
+    earlier versions (a word index, and trigrams over the raw content) are
+    dropped. If the SQLite build has no trigram tokenizer, search scans
+    content_lower instead.
+    """
+    global _fts_indexes
+    _fts_indexes = set()
+
+    for name in ("messages_fts", "messages_trigram"):
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        row = cursor.fetchone()
+        if row is not None and (name == "messages_fts" or "content_lower" not in row["sql"]):
+            for suffix in ("insert", "delete", "update"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}_{suffix}")
+            cursor.execute(f"DROP TABLE {name}")
+
+    try:
+        _create_trigram_index(cursor)
+        _fts_indexes.add("messages_trigram")
+    except sqlite3.OperationalError as e:
+        logger.warning(f"Full-text index messages_trigram unavailable: {e}")
+
+
+def _create_trigram_index(cursor: sqlite3.Cursor) -> None:
+    """Create the external-content trigram index over messages.content_lower and its sync triggers."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_trigram'")
+    exists = cursor.fetchone() is not None
+
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_trigram
+        USING fts5(content_lower, content='messages', content_rowid='rowid',
+                   tokenize='trigram case_sensitive 1')
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS messages_trigram_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_trigram(rowid, content_lower) VALUES (new.rowid, new.content_lower);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS messages_trigram_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_trigram(messages_trigram, rowid, content_lower)
+            VALUES ('delete', old.rowid, old.content_lower);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS messages_trigram_update AFTER UPDATE OF content_lower ON messages BEGIN
+            INSERT INTO messages_trigram(messages_trigram, rowid, content_lower)
+            VALUES ('delete', old.rowid, old.content_lower);
+            INSERT INTO messages_trigram(rowid, content_lower) VALUES (new.rowid, new.content_lower);
+        END
+    """)
+
+    if not exists:
+        cursor.execute("INSERT INTO messages_trigram(messages_trigram) VALUES ('rebuild')")
+
+
+def fulltext_indexes() -> set[str]:
+    """Get the names of the FTS5 message indexes present in the database.
+
+    Returns:
+        Set containing "messages_trigram" if the index exists, else empty
+    """
+    global _fts_indexes
+    if _fts_indexes is None:
+        with connection_context() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'messages_trigram'"
+            )
+            _fts_indexes = {row["name"] for row in cursor.fetchall()}
+    return _fts_indexes
+
+
 # Session CRUD operations
 
 def create_session(session: Session) -> Session:
@@ -357,15 +492,47 @@ def create_message(message: Message) -> Message:
     with connection_context() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """INSERT INTO messages (id, session_id, role, content, token_count, attachments, created_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            """INSERT INTO messages (id, session_id, role, content, token_count, attachments, created_at,
+                                     content_lower)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
             (message.id, message.session_id, message.role, message.content,
-             message.token_count, message.attachments, message.created_at)
+             message.token_count, message.attachments, message.created_at, _lower(message.content))
         )
         logger.debug(f"Created message: {message.id}")
         return message
 
 
+def commit_chat_turn(user_message: Message, assistant_message: Message, session_id: str) -> None:
+    """Persist a complete chat turn in a single transaction.
+
+    Inserts the user and assistant messages and bumps the session's
+    updated_at, committing once instead of once per statement.
+
+    Args:
+        user_message: The user's message for this turn
+        assistant_message: The generated assistant reply
+        session_id: The session UUID to touch
+    """
+    with connection_context() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """INSERT INTO messages (id, session_id, role, content, token_count, attachments, created_at,
+                                     content_lower)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (m.id, m.session_id, m.role, m.content, m.token_count, m.attachments, m.created_at,
+                 _lower(m.content))
+                for m in (user_message, assistant_message)
+            ]
+        )
+        cursor.execute(
+            "UPDATE sessions SET updated_at = ? WHERE id = ?",
+            (datetime.now().timestamp(), session_id)
+        )
+        logger.debug(f"Committed chat turn for session {session_id}: "
+                     f"{user_message.id}, {assistant_message.id}")
+
+
 def get_messages(session_id: str, limit: int = 100, offset: int = 0) -> list[Message]:
     """Retrieve all messages for a session.
 
@@ -397,6 +564,75 @@ def get_messages(session_id: str, limit: int = 100, offset: int = 0) -> list[Mes
         ]
 
 
+def search_messages(query: str, session_id: Optional[str] = None, limit: Optional[int] = None
+                    ) -> tuple[list[tuple[Message, Optional[str]]], int]:
+    """Find messages containing a query as a case-insensitive substring.
+
+    A message matches when its content_lower (str.lower() of the content)
+    contains query.lower(), which is checked inside SQLite with instr(), a
+    byte-level scan of the UTF-8 text. Queries of three or more characters
+    first narrow the candidates through the trigram index, which holds the
+    same lowercased text and so selects exactly the rows that pass the
+    check. Shorter queries, and databases without the index, scan
+    content_lower directly.
+
+    Args:
+        query: Search text
+        session_id: Optional session UUID to restrict the search to
+        limit: Maximum number of messages to return; all matches are still
+            counted
+
+    Returns:
+        Tuple of (matches, total). matches is a list of (Message, session
+        name) pairs ordered by most recently updated session, then message
+        creation time; total is the number of matching messages.
+    """
+    needle = query.lower()
+    if len(query) >= 3 and "messages_trigram" in fulltext_indexes():
+        sql = """SELECT m.*, s.name AS session_name
+                 FROM messages_trigram
+                 JOIN messages m ON m.rowid = messages_trigram.rowid
+                 JOIN sessions s ON s.id = m.session_id
+                 WHERE messages_trigram MATCH ?
+                   AND instr(m.content_lower, ?) > 0"""
+        params: list = ['"' + needle.replace('"', '""') + '"', needle]
+    else:
+        sql = """SELECT m.*, s.name AS session_name
+                 FROM messages m
+                 JOIN sessions s ON s.id = m.session_id
+                 WHERE instr(m.content_lower, ?) > 0"""
+        params = [needle]
+    if session_id is not None:
+        sql += " AND m.session_id = ?"
+        params.append(session_id)
+    sql += " ORDER BY s.updated_at DESC, m.created_at ASC"
+
+    matches: list[tuple[Message, Optional[str]]] = []
+    total = 0
+    with connection_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        # Rows are consumed one at a time; only the first `limit` matches
+        # are turned into Message objects
+        for row in cursor:
+            total += 1
+            if limit is None or len(matches) < limit:
+                matches.append((
+                    Message(
+                        id=row["id"],
+                        session_id=row["session_id"],
+                        role=row["role"],
+                        content=row["content"],
+                        token_count=row["token_count"],
+                        attachments=row["attachments"],
+                        created_at=row["created_at"],
+                        content_lower=row["content_lower"]
+                    ),
+                    row["session_name"],
+                ))
+    return matches, total
+
+
 def get_message(message_id: str) -> Optional[Message]:
     """Retrieve a message by ID.
 
@@ -440,8 +676,8 @@ def update_message(message_id: str, content: Optional[str] = None,
         updates = []
         params = []
         if content is not None:
-            updates.append("content = ?")
-            params.append(content)
+            updates.append("content = ?, content_lower = ?")
+            params.extend((content, content.lower()))
         if token_count is not None:
             updates.append("token_count = ?")
             params.append(token_count)
@@ -533,6 +769,37 @@ def get_attachment(attachment_id: str) -> Optional[Attachment]:
         )
 
 
+def get_attachment_by_hash(content_hash: str) -> Optional[Attachment]:
+    """Retrieve the most recent attachment with the given content hash.
+
+    Args:
+        content_hash: SHA-256 hex digest of the file content
+
+    Returns:
+        Attachment object if found, None otherwise
+    """
+    with connection_context() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT * FROM attachments WHERE content_hash = ? ORDER BY created_at DESC LIMIT 1",
+            (content_hash,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return Attachment(
+            id=row["id"],
+            message_id=row["message_id"],
+            filename=row["filename"],
+            file_type=row["file_type"],
+            file_size=row["file_size"],
+            content_hash=row["content_hash"],
+            storage_path=row["storage_path"],
+            extracted_text=row["extracted_text"],
+            created_at=row["created_at"]
+        )
+
+
 def get_attachments_for_message(message_id: str) -> list[Attachment]:
     """Retrieve all attachments for a message.
 
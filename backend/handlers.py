@@ -9,29 +9,36 @@ Design follows Requirements 14.7, 14.6.
 
 import json
 import logging
-from dataclasses import dataclass, field, asdict
-from typing import Optional, Dict, Any, List
+from dataclasses import dataclass, field, asdict, replace
+from typing import Optional, Dict, Any, List, Set, Iterator
 from http.server import BaseHTTPRequestHandler
 from datetime import datetime
 from pathlib import Path
 import hashlib
+import threading
+import time
 import uuid
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from .config import load_config
 from .database import (
     Session, Message, Attachment,
     create_session, get_session, get_all_sessions, update_session, delete_session,
-    create_message, get_messages, get_message, update_message, delete_message,
-    create_attachment, get_attachment, get_attachments_for_message, delete_attachment,
+    create_message, commit_chat_turn, get_messages, get_message, update_message, delete_message,
+    search_messages,
+    create_attachment, get_attachment, get_attachment_by_hash, get_attachments_for_message, delete_attachment,
     init_db
 )
-from .llm_adapter import (
-    LLMProvider, LLMConfig, ModelInfo, ProviderStatus, LLMResponse,
-    LocalModelProvider, create_local_provider
-)
-from .context_builder import ContextBuilder, Message as ContextMessage, ConversationContext, ContextBuilderConfig
-from .token_estimator import TokenEstimator
-from .file_parser import FileParser
+from .llm_adapter import LLMProvider, LLMConfig, ModelInfo
+
+# NOTE: the context builder, token estimator, file parser and provider
+# factory are imported lazily inside their get_* accessors (and the chat
+# handlers) so server start-up only pays for the parts a request uses.
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +47,7 @@ logger = logging.getLogger(__name__)
 # Request/Response Dataclasses
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class ErrorResponse:
     """Standard error response format."""
     error: str
@@ -51,7 +58,7 @@ class ErrorResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionCreateRequest:
     """Request body for creating a session."""
     name: Optional[str] = None
@@ -67,7 +74,7 @@ class SessionCreateRequest:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionResponse:
     """Response for session operations."""
     id: str
@@ -100,7 +107,7 @@ class SessionResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class SessionListResponse:
     """Response for listing sessions."""
     sessions: List[SessionResponse]
@@ -117,7 +124,7 @@ class SessionListResponse:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageCreateRequest:
     """Request body for creating a message."""
     content: str
@@ -133,7 +140,7 @@ class MessageCreateRequest:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageResponse:
     """Response for message operations."""
     id: str
@@ -157,11 +164,8 @@ class MessageResponse:
                 }
                 for a in attachments
             ]
-        elif message.attachments:
-            try:
-                attachments_list = json.loads(message.attachments)
-            except json.JSONDecodeError:
-                attachments_list = None
+        else:
+            attachments_list = message.attachments_parsed
         return cls(
             id=message.id,
             session_id=message.session_id,
@@ -176,7 +180,7 @@ class MessageResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageListResponse:
     """Response for listing messages."""
     messages: List[MessageResponse]
@@ -193,7 +197,7 @@ class MessageListResponse:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatRequest:
     """Request body for chat message with streaming option."""
     content: str
@@ -211,7 +215,7 @@ class ChatRequest:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatResponse:
     """Response for chat message."""
     message: MessageResponse
@@ -226,7 +230,7 @@ class ChatResponse:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class FileUploadRequest:
     """Request for file upload (multipart handled separately)."""
     filename: str
@@ -238,7 +242,7 @@ class FileUploadRequest:
         return cls(filename=filename, file_type=file_type, content_hash=content_hash)
 
 
-@dataclass
+@dataclass(slots=True)
 class FileResponse:
     """Response for file operations."""
     id: str
@@ -265,7 +269,7 @@ class FileResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelResponse:
     """Response for model listing."""
     id: str
@@ -292,7 +296,7 @@ class ModelResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class ProviderResponse:
     """Response for provider listing."""
     id: str
@@ -309,7 +313,7 @@ class ProviderResponse:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMConfigResponse:
     """Response for LLM configuration."""
     provider: str
@@ -325,7 +329,7 @@ class LLMConfigResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class HealthResponse:
     """Response for health check."""
     status: str
@@ -338,7 +342,7 @@ class HealthResponse:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResult:
     """Single search result."""
     session_id: str
@@ -352,7 +356,7 @@ class SearchResult:
         return asdict(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchResponse:
     """Response for search operations."""
     query: str
@@ -376,6 +380,8 @@ _token_estimator = None
 _file_parser = None
 _context_builder = None
 _llm_provider: Optional[LLMProvider] = None
+_default_llm_config: Optional[LLMConfig] = None
+_llm_cache = None
 
 
 def get_config():
@@ -390,6 +396,7 @@ def get_token_estimator():
     """Get or create token estimator instance."""
     global _token_estimator
     if _token_estimator is None:
+        from .token_estimator import TokenEstimator
         _token_estimator = TokenEstimator()
     return _token_estimator
 
@@ -398,6 +405,7 @@ def get_file_parser():
     """Get or create file parser instance."""
     global _file_parser
     if _file_parser is None:
+        from .file_parser import FileParser
         _file_parser = FileParser()
     return _file_parser
 
@@ -411,6 +419,7 @@ def get_context_builder(config=None):
     """
     global _context_builder
     if _context_builder is None:
+        from .context_builder import ContextBuilder, ContextBuilderConfig
         max_context_tokens = config.llm.n_ctx if config else 8192
         context_config = ContextBuilderConfig(max_context_tokens=max_context_tokens)
         _context_builder = ContextBuilder(
@@ -420,25 +429,68 @@ def get_context_builder(config=None):
     return _context_builder
 
 
+def get_default_llm_config() -> LLMConfig:
+    """Get or create the default inference config built from settings.
+
+    Chat handlers derive per-request configs from this with
+    dataclasses.replace instead of re-reading settings every turn. It is
+    reset whenever the LLM settings are updated at runtime.
+    """
+    global _default_llm_config
+    if _default_llm_config is None:
+        config = get_config()
+        _default_llm_config = LLMConfig(
+            max_tokens=config.llm.max_tokens,
+            temperature=config.llm.temperature,
+            top_p=config.llm.top_p,
+            top_k=config.llm.top_k,
+            stop_tokens=config.llm.stop,
+            n_ctx=config.llm.n_ctx,
+            n_batch=config.llm.n_batch,
+            n_threads=config.llm.n_threads,
+            n_gpu_layers=config.llm.n_gpu_layers,
+            n_draft=config.llm.n_draft,
+            use_mmap=config.llm.use_mmap,
+            use_mlock=config.llm.use_mlock,
+            numa=config.llm.numa,
+            prompt_cache_bytes=config.llm.prompt_cache_bytes,
+        )
+    return _default_llm_config
+
+
+def get_request_llm_config(max_tokens: Optional[int] = None,
+                           temperature: Optional[float] = None) -> LLMConfig:
+    """Get the inference config for a request, applying any overrides."""
+    default = get_default_llm_config()
+    if max_tokens is None and temperature is None:
+        return default
+    return replace(
+        default,
+        max_tokens=max_tokens if max_tokens is not None else default.max_tokens,
+        temperature=temperature if temperature is not None else default.temperature,
+    )
+
+
+def get_llm_cache():
+    """Get or create the response cache for deterministic generations."""
+    global _llm_cache
+    if _llm_cache is None:
+        from .llm_cache import LLMCache
+        _llm_cache = LLMCache()
+    return _llm_cache
+
+
 def get_llm_provider() -> LLMProvider:
     """Get or create LLM provider instance."""
     global _llm_provider
     if _llm_provider is None:
+        from .llm_adapter import create_local_provider
         config = get_config()
         _llm_provider = create_local_provider(
             model_path=config.llm.model_path,
             system_prompt=config.llm.system_prompt,
-            config=LLMConfig(
-                max_tokens=config.llm.max_tokens,
-                temperature=config.llm.temperature,
-                top_p=config.llm.top_p,
-                top_k=config.llm.top_k,
-                stop_tokens=config.llm.stop,
-                n_ctx=config.llm.n_ctx,
-                n_batch=config.llm.n_batch,
-                n_threads=config.llm.n_threads,
-                n_gpu_layers=config.llm.n_gpu_layers,
-            )
+            config=get_default_llm_config(),
+            response_cache=get_llm_cache(),
         )
         try:
             _llm_provider.connect()
@@ -453,21 +505,37 @@ def get_llm_provider() -> LLMProvider:
 # =============================================================================
 
 def json_response(handler: BaseHTTPRequestHandler, status: int, data: Dict[str, Any]) -> None:
-    """Send a JSON response."""
+    """Send a JSON response.
+
+    orjson encodes straight to UTF-8 bytes when installed, skipping the
+    intermediate str that json.dumps builds for long message contents.
+    """
+    if orjson is not None:
+        body = orjson.dumps(data)
+    else:
+        body = json.dumps(data).encode("utf-8")
+    json_bytes_response(handler, status, body)
+
+
+def json_bytes_response(handler: BaseHTTPRequestHandler, status: int, body: bytes) -> None:
+    """Send an already-encoded JSON body."""
     handler.send_response(status)
     handler.send_header("Content-Type", "application/json")
     handler.send_header("Access-Control-Allow-Origin", "*")
     handler.end_headers()
-    handler.wfile.write(json.dumps(data).encode("utf-8"))
+    handler.wfile.write(body)
 
 
 def error_response(handler: BaseHTTPRequestHandler, status: int, error: str, message: str) -> None:
-    """Send a JSON error response."""
-    json_response(handler, status, ErrorResponse(
-        error=error,
-        message=message,
-        code=status
-    ).to_dict())
+    """Send a JSON error response.
+
+    Encodes the ErrorResponse shape directly from a dict literal; error
+    paths are common enough that the dataclass/asdict round-trip is not
+    worth paying for.
+    """
+    json_bytes_response(handler, status, json.dumps(
+        {"error": error, "message": message, "code": status}
+    ).encode("utf-8"))
     logger.warning(f"Error {status}: {error} - {message}")
 
 
@@ -483,6 +551,63 @@ def parse_json_body(handler: BaseHTTPRequestHandler) -> Optional[Dict[str, Any]]
         return None
 
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def read_body_hashed(handler: BaseHTTPRequestHandler, content_length: int) -> tuple[bytearray, str]:
+    """Read a request body in fixed-size chunks, hashing it as it arrives.
+
+    The body is read straight into a single preallocated buffer, so large
+    uploads are held in memory once instead of being copied for hashing.
+
+    Returns:
+        Tuple of (body buffer, SHA-256 hex digest)
+    """
+    buf = bytearray(content_length)
+    view = memoryview(buf)
+    digest = hashlib.sha256()
+    received = 0
+    while received < content_length:
+        n = handler.rfile.readinto(view[received:received + UPLOAD_CHUNK_SIZE])
+        if not n:
+            raise ConnectionError(f"Upload truncated after {received} of {content_length} bytes")
+        digest.update(view[received:received + n])
+        received += n
+    view.release()
+    return buf, digest.hexdigest()
+
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    """Encode a single Server-Sent Events frame."""
+    frame = f"data: {json.dumps(data)}\n\n"
+    if event:
+        frame = f"event: {event}\n" + frame
+    return frame.encode("utf-8")
+
+
+def iter_stream_tokens(llm: LLMProvider, prompt: str, config: Optional[LLMConfig] = None) -> Iterator[Any]:
+    """Drive the provider's async token stream from a synchronous HTTP handler.
+
+    Tokens are yielded as soon as the provider produces them, so callers can
+    forward each one to the client without waiting for the full completion.
+    The prompt must already be ChatML-formatted (see format_for_llm).
+    """
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    agen = llm.stream(prompt=prompt, config=config, preformatted=True)
+    try:
+        while True:
+            try:
+                token = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+            yield token
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
 def generate_id() -> str:
     """Generate a unique ID."""
     return str(uuid.uuid4())
@@ -490,28 +615,42 @@ def generate_id() -> str:
 
 def get_timestamp() -> float:
     """Get current timestamp."""
-    return datetime.now().timestamp()
+    # Same value as datetime.now().timestamp() without building a datetime
+    return time.time()
 
 
 # =============================================================================
 # Health Check Handler
 # =============================================================================
 
+# Health probes hit this endpoint constantly; version and provider are fixed
+# for the life of the process, so the body is pre-rendered once with
+# placeholders for the fields that change between calls.
+_health_template: Optional[str] = None
+
+
+def _get_health_template() -> str:
+    """Get or build the pre-rendered health response template."""
+    global _health_template
+    if _health_template is None:
+        _health_template = (
+            '{"status": "%s", "version": "1.0.0", "database": "%s", '
+            '"llm_provider": ' + json.dumps(get_config().llm.provider).replace("%", "%%") +
+            ', "timestamp": %r}'
+        )
+    return _health_template
+
+
 def health_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str], query: Dict[str, Any]) -> None:
     """Handle health check requests (GET /health)."""
     try:
-        config = get_config()
-        db_path = config.database.path
-        db_exists = db_path.exists()
-        
-        response = HealthResponse(
-            status="healthy" if db_exists else "degraded",
-            version="1.0.0",
-            database="ok" if db_exists else "not initialized",
-            llm_provider=get_config().llm.provider,
-            timestamp=get_timestamp()
+        db_exists = get_config().database.path.exists()
+        body = _get_health_template() % (
+            "healthy" if db_exists else "degraded",
+            "ok" if db_exists else "not initialized",
+            get_timestamp(),
         )
-        json_response(handler, 200, response.to_dict())
+        json_bytes_response(handler, 200, body.encode("utf-8"))
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         error_response(handler, 500, "health_check_failed", str(e))
@@ -683,6 +822,21 @@ def get_messages_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str]
         error_response(handler, 500, "retrieval_failed", str(e))
 
 
+def _keep_user_message(user_message: Optional[Message]) -> None:
+    """Persist the user's message of a turn that ended before commit_chat_turn.
+
+    Failed and cancelled turns keep the user's message, as they did when it was
+    saved ahead of generation. Errors are logged rather than raised so they
+    don't mask the failure being reported.
+    """
+    if user_message is None:
+        return
+    try:
+        create_message(user_message)
+    except Exception as e:
+        logger.error(f"Failed to save user message {user_message.id}: {e}")
+
+
 def create_message_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str], query: Dict[str, Any]) -> None:
     """Handle message creation and chat response (POST /api/v1/sessions/{id}/messages)."""
     session_id = params.get("id")
@@ -695,6 +849,9 @@ def create_message_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
         error_response(handler, 400, "invalid_json", "Request body must be valid JSON")
         return
 
+    # The user's message until the turn is committed; saved on its own if
+    # anything fails before that
+    pending_user_message: Optional[Message] = None
     try:
         # Verify session exists
         session = get_session(session_id)
@@ -716,41 +873,31 @@ def create_message_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
             token_count=get_token_estimator().count_tokens(request.content),
             created_at=get_timestamp(),
         )
-        create_message(user_message)
-
-        # Build context for LLM
-        context_messages = [
-            ContextMessage(
-                role=m.role,
-                content=m.content or "",
-                token_count=m.token_count or 0,
-                created_at=m.created_at or 0,
-            )
-            for m in existing_messages
-        ]
-        context_messages.append(ContextMessage(
-            role="user",
-            content=request.content,
-            token_count=user_message.token_count or 0,
-            created_at=user_message.created_at or 0,
-        ))
+        pending_user_message = user_message
 
+        # Build context for LLM; stored messages are passed straight through
         context_builder = get_context_builder(get_config())
         context = context_builder.build_context(
-            context_messages,
+            [*existing_messages, user_message],
             system_prompt=session.system_prompt
         )
 
         # Get LLM response
         llm = get_llm_provider()
-        llm_config = LLMConfig(
-            max_tokens=request.max_tokens or get_config().llm.max_tokens,
-            temperature=request.temperature or get_config().llm.temperature,
-        )
+        llm_config = get_request_llm_config(request.max_tokens, request.temperature)
+
+        prompt = context_builder.format_for_llm(context)
+
+        if request.stream:
+            # The stream persists the turn, or the user's message on failure
+            pending_user_message = None
+            _stream_chat_response(handler, llm, prompt, llm_config, session_id, user_message)
+            return
 
         response = llm.generate(
-            prompt=context_builder.format_for_llm(context),
-            config=llm_config
+            prompt=prompt,
+            config=llm_config,
+            preformatted=True
         )
 
         # Create assistant message
@@ -762,10 +909,9 @@ def create_message_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
             token_count=get_token_estimator().count_tokens(response.content),
             created_at=get_timestamp(),
         )
-        create_message(assistant_message)
-
-        # Update session timestamp
-        update_session(session_id)
+        # Persist both messages and touch the session in one transaction
+        commit_chat_turn(user_message, assistant_message, session_id)
+        pending_user_message = None
 
         chat_response = ChatResponse(
             message=MessageResponse.from_message(user_message),
@@ -776,9 +922,84 @@ def create_message_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
         logger.info(f"Chat response for session {session_id}: {len(response.content)} chars")
     except Exception as e:
         logger.error(f"Failed to create message: {e}")
+        _keep_user_message(pending_user_message)
         error_response(handler, 500, "creation_failed", str(e))
 
 
+def _stream_chat_response(handler: BaseHTTPRequestHandler, llm: LLMProvider, prompt: str,
+                          llm_config: LLMConfig, session_id: str, user_message: Message) -> None:
+    """Stream the assistant reply as Server-Sent Events.
+
+    Each token is written and flushed as soon as the provider yields it. The
+    chunks are joined once at the end to persist the assistant message, and a
+    final ``complete`` event carries the same payload as the non-streaming
+    response.
+    """
+    chunks: List[str] = []
+    turn_committed = False
+    try:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Access-Control-Allow-Origin", "*")
+        handler.end_headers()
+        # wfile may be buffered; let the client see the stream open right away
+        handler.wfile.flush()
+
+        tokens = iter_stream_tokens(llm, prompt, llm_config)
+        try:
+            for token in tokens:
+                if not token.text:
+                    continue
+                chunks.append(token.text)
+                handler.wfile.write(sse_event({"delta": token.text}))
+                handler.wfile.flush()
+        finally:
+            # Stop the model right away when the client goes or an error
+            # ends the stream, rather than whenever the generator is collected
+            tokens.close()
+
+        content = "".join(chunks)
+
+        # Create assistant message
+        assistant_message = Message(
+            id=generate_id(),
+            session_id=session_id,
+            role="assistant",
+            content=content,
+            token_count=get_token_estimator().count_tokens(content),
+            created_at=get_timestamp(),
+        )
+        # Persist both messages and touch the session in one transaction
+        commit_chat_turn(user_message, assistant_message, session_id)
+        turn_committed = True
+
+        chat_response = ChatResponse(
+            message=MessageResponse.from_message(user_message),
+            response=MessageResponse.from_message(assistant_message),
+            usage={"completion_tokens": len(chunks)}
+        )
+        handler.wfile.write(sse_event(chat_response.to_dict(), event="complete"))
+        handler.wfile.flush()
+        logger.info(f"Streamed chat response for session {session_id}: {len(content)} chars")
+    except (BrokenPipeError, ConnectionResetError):
+        # The client went away; there is no one left to report to
+        logger.info(f"Client disconnected from chat stream for session {session_id}")
+        if not turn_committed:
+            _keep_user_message(user_message)
+        handler.close_connection = True
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        logger.error(f"Streaming chat response failed for session {session_id}: {e}")
+        if not turn_committed:
+            _keep_user_message(user_message)
+        try:
+            handler.wfile.write(sse_event({"error": "streaming_failed", "message": str(e)}, event="error"))
+            handler.wfile.flush()
+        except OSError:
+            handler.close_connection = True
+
+
 def delete_message_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str], query: Dict[str, Any]) -> None:
     """Handle message deletion (DELETE /api/v1/sessions/{id}/messages/{message_id})."""
     session_id = params.get("id")
@@ -851,17 +1072,21 @@ def upload_file_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str],
         filename = query.get("filename", "uploaded_file")
         file_type = query.get("file_type", "text/plain")
 
-        content = handler.rfile.read(content_length)
-        content_hash = hashlib.sha256(content).hexdigest()
-
-        # Check for duplicate
-        existing = None
-        # Note: Would need a get_attachment_by_hash function for true deduplication
-
-        # Parse file content
-        file_parser = get_file_parser()
-        parse_result = file_parser.parse_content(content, filename)
-        extracted_text = parse_result.content if parse_result.success else ""
+        content, content_hash = read_body_hashed(handler, content_length)
+
+        # Reuse extracted text from an identical earlier upload; parsing is
+        # by far the most expensive step of an upload. The extension must
+        # match too, since it selects the parser. An empty text means that
+        # upload's parse failed or timed out, so it is parsed again.
+        existing = get_attachment_by_hash(content_hash)
+        if (existing is not None and existing.extracted_text
+                and Path(existing.filename or "").suffix.lower() == Path(filename).suffix.lower()):
+            extracted_text = existing.extracted_text
+            logger.debug(f"Reusing parsed content of attachment {existing.id} for {filename}")
+        else:
+            file_parser = get_file_parser()
+            parse_result = file_parser.parse_content(content, filename)
+            extracted_text = parse_result.content if parse_result.success else ""
 
         # Create attachment
         attachment = Attachment(
@@ -974,6 +1199,7 @@ def get_llm_status_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
 
 def update_llm_config_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str], query: Dict[str, Any]) -> None:
     """Handle LLM config update (PUT /api/v1/llm/config)."""
+    global _default_llm_config
     body = parse_json_body(handler)
     if body is None:
         error_response(handler, 400, "invalid_json", "Request body must be valid JSON")
@@ -992,6 +1218,9 @@ def update_llm_config_handler(handler: BaseHTTPRequestHandler, params: Dict[str,
         if "system_prompt" in body:
             config.llm.system_prompt = body["system_prompt"]
 
+        # Rebuild the default inference config on next use
+        _default_llm_config = None
+
         response = LLMConfigResponse(
             provider=config.llm.provider,
             base_url=config.llm.base_url,
@@ -1013,6 +1242,22 @@ def update_llm_config_handler(handler: BaseHTTPRequestHandler, params: Dict[str,
 # Search Handlers
 # =============================================================================
 
+# Maximum number of results returned by the global search
+SEARCH_RESULT_LIMIT = 50
+
+
+def _search_result(msg: Message, session_name: Optional[str]) -> SearchResult:
+    """Build a search result with a truncated content snippet."""
+    return SearchResult(
+        session_id=msg.session_id,
+        session_name=session_name,
+        message_id=msg.id,
+        content=msg.content[:200] + "..." if len(msg.content) > 200 else msg.content,
+        created_at=msg.created_at,
+        score=1.0  # Simple scoring for now
+    )
+
+
 def search_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str], query: Dict[str, Any]) -> None:
     """Handle global search (GET /api/v1/search)."""
     search_query = query.get("q", "")
@@ -1021,27 +1266,13 @@ def search_handler(handler: BaseHTTPRequestHandler, params: Dict[str, str], quer
         return
 
     try:
-        sessions = get_all_sessions(limit=100)
-        results = []
-        search_lower = search_query.lower()
-
-        for session in sessions:
-            messages = get_messages(session.id)
-            for msg in messages:
-                if msg.content and search_lower in msg.content.lower():
-                    results.append(SearchResult(
-                        session_id=session.id,
-                        session_name=session.name,
-                        message_id=msg.id,
-                        content=msg.content[:200] + "..." if len(msg.content) > 200 else msg.content,
-                        created_at=msg.created_at,
-                        score=1.0  # Simple scoring for now
-                    ))
+        matches, total = search_messages(search_query, limit=SEARCH_RESULT_LIMIT)
+        results = [_search_result(msg, session_name) for msg, session_name in matches]
 
         response = SearchResponse(
             query=search_query,
-            results=results[:50],  # Limit results
-            total=len(results)
+            results=results,
+            total=total
         )
         json_response(handler, 200, response.to_dict())
     except Exception as e:
@@ -1068,20 +1299,8 @@ def search_session_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
             error_response(handler, 404, "not_found", f"Session {session_id} not found")
             return
 
-        messages = get_messages(session_id)
-        results = []
-        search_lower = search_query.lower()
-
-        for msg in messages:
-            if msg.content and search_lower in msg.content.lower():
-                results.append(SearchResult(
-                    session_id=session_id,
-                    session_name=session.name,
-                    message_id=msg.id,
-                    content=msg.content[:200] + "..." if len(msg.content) > 200 else msg.content,
-                    created_at=msg.created_at,
-                    score=1.0
-                ))
+        matches, _ = search_messages(search_query, session_id=session_id)
+        results = [_search_result(msg, session.name) for msg, _ in matches]
 
         response = SearchResponse(
             query=search_query,
@@ -1103,18 +1322,35 @@ def search_session_handler(handler: BaseHTTPRequestHandler, params: Dict[str, st
 # crashing the module import when websockets is not installed.
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamingSession:
     """Tracks streaming state for a session."""
     session_id: str
     message_id: str
-    accumulated_content: str = ""
+    # Generated token texts; joined on demand instead of concatenating per token
+    chunks: List[str] = field(default_factory=list)
     last_token_time: float = 0.0
     token_count: int = 0
     is_streaming: bool = False
     cancel_requested: bool = False
     created_at: float = field(default_factory=get_timestamp)
 
+    @property
+    def accumulated_content(self) -> str:
+        """Full text generated so far."""
+        return "".join(self.chunks)
+
+    def content_prefix(self, limit: int) -> str:
+        """First `limit` characters generated so far, joining only the chunks needed."""
+        parts: List[str] = []
+        length = 0
+        for chunk in self.chunks:
+            if length >= limit:
+                break
+            parts.append(chunk)
+            length += len(chunk)
+        return "".join(parts)[:limit]
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "session_id": self.session_id,
@@ -1128,8 +1364,117 @@ class StreamingSession:
         }
 
 
+# Flow control for the WebSocket server. Incoming frames are buffered up to
+# WS_MAX_QUEUE messages; outgoing data beyond WS_WRITE_LIMIT bytes makes
+# websocket.send() wait for the transport to drain, which in turn pauses
+# the token loop in _stream_llm_response for slow clients.
+WS_MAX_QUEUE = 32
+WS_WRITE_LIMIT = 2 ** 16
+
+
+class StreamingSessionRegistry:
+    """Active streaming sessions keyed by session ID, split across shards.
+
+    Each shard is a dict with its own lock, so the WebSocket loop and any
+    other thread touching the registry only contend when they hit the same
+    shard. Operations are short and never await, so a threading.Lock is
+    safe to take from coroutines.
+
+    Streams normally remove themselves when they finish. As a backstop for
+    streams whose cleanup never ran, each shard holds at most
+    max_sessions // shard_count entries (the least recently registered is
+    evicted first), and reap() drops entries idle for longer than ttl.
+    """
+
+    def __init__(self, shard_count: int = 16, max_sessions: int = 10_000, ttl: float = 3600.0):
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(shard_count)]
+        self._locks = [threading.Lock() for _ in range(shard_count)]
+        self._shard_capacity = max(1, max_sessions // shard_count)
+        self.ttl = ttl
+
+    def _shard(self, session_id: str) -> tuple:
+        index = hash(session_id) % len(self._shards)
+        return self._shards[index], self._locks[index]
+
+    def get(self, session_id: Optional[str]) -> Optional[StreamingSession]:
+        """Get the active streaming session for a session ID, if any."""
+        if not session_id:
+            return None
+        shard, lock = self._shard(session_id)
+        with lock:
+            return shard.get(session_id)
+
+    def register(self, session: StreamingSession) -> None:
+        """Make a streaming session the active one for its session ID."""
+        shard, lock = self._shard(session.session_id)
+        with lock:
+            shard[session.session_id] = session
+            shard.move_to_end(session.session_id)
+            while len(shard) > self._shard_capacity:
+                _, evicted = shard.popitem(last=False)
+                logger.warning(f"Evicted streaming session {evicted.session_id}: registry full")
+
+    def remove(self, session: StreamingSession) -> None:
+        """Remove a streaming session unless a newer stream has replaced it."""
+        shard, lock = self._shard(session.session_id)
+        with lock:
+            if shard.get(session.session_id) is session:
+                del shard[session.session_id]
+
+    def reap(self, now: Optional[float] = None) -> int:
+        """Remove sessions with no activity within the TTL.
+
+        Args:
+            now: Current timestamp; defaults to get_timestamp()
+
+        Returns:
+            Number of sessions removed
+        """
+        now = get_timestamp() if now is None else now
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                stale = [
+                    session_id for session_id, session in shard.items()
+                    if now - max(session.created_at, session.last_token_time) > self.ttl
+                ]
+                for session_id in stale:
+                    del shard[session_id]
+                removed += len(stale)
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+def _ws_dumps(obj: Any) -> str:
+    """Serialize a WebSocket event, using orjson's C encoder when installed.
+
+    The result is returned as str so websockets sends a text frame; the
+    browser client only parses text frames.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
 # Global state for WebSocket sessions
-_streaming_sessions: Dict[str, StreamingSession] = {}
+_streaming_sessions = StreamingSessionRegistry()
+
+# Seconds between sweeps for streaming sessions whose cleanup never ran
+STREAMING_SESSION_REAP_INTERVAL = 60.0
+
+
+async def _reap_streaming_sessions() -> None:
+    """Periodically drop streaming sessions that have outlived their TTL."""
+    import asyncio
+    while True:
+        await asyncio.sleep(STREAMING_SESSION_REAP_INTERVAL)
+        removed = _streaming_sessions.reap()
+        if removed:
+            logger.info(f"Reaped {removed} stale streaming sessions")
+
+
 _active_connections: Dict[str, Set[Any]] = {}
 
 
@@ -1160,7 +1505,7 @@ async def websocket_handler(websocket) -> None:
                 if msg_type == "send_message":
                     session_id = data.get("session_id")
                     if not session_id:
-                        await websocket.send(json.dumps({
+                        await websocket.send(_ws_dumps({
                             "type": "error",
                             "error": "missing_session_id",
                             "message": "Session ID is required"
@@ -1169,7 +1514,7 @@ async def websocket_handler(websocket) -> None:
 
                     content = data.get("content", "")
                     if not content:
-                        await websocket.send(json.dumps({
+                        await websocket.send(_ws_dumps({
                             "type": "error",
                             "error": "missing_content",
                             "message": "Content is required"
@@ -1183,10 +1528,10 @@ async def websocket_handler(websocket) -> None:
                     )
 
                 elif msg_type == "cancel_stream":
-                    if session_id and session_id in _streaming_sessions:
-                        session = _streaming_sessions[session_id]
+                    session = _streaming_sessions.get(session_id)
+                    if session is not None:
                         session.cancel_requested = True
-                        await websocket.send(json.dumps({
+                        await websocket.send(_ws_dumps({
                             "type": "complete",
                             "message_id": session.message_id,
                             "accumulated_content": session.accumulated_content,
@@ -1194,24 +1539,24 @@ async def websocket_handler(websocket) -> None:
                             "cancelled": True
                         }))
                     else:
-                        await websocket.send(json.dumps({
+                        await websocket.send(_ws_dumps({
                             "type": "error",
                             "error": "no_active_stream",
                             "message": "No active stream to cancel"
                         }))
 
                 elif msg_type == "get_status":
-                    if session_id and session_id in _streaming_sessions:
-                        session = _streaming_sessions[session_id]
-                        await websocket.send(json.dumps({
+                    session = _streaming_sessions.get(session_id)
+                    if session is not None:
+                        await websocket.send(_ws_dumps({
                             "type": "status",
                             "session_id": session_id,
                             "is_streaming": session.is_streaming,
                             "token_count": session.token_count,
-                            "accumulated_content": session.accumulated_content[:100]  # Truncate for efficiency
+                            "accumulated_content": session.content_prefix(100)  # Truncate for efficiency
                         }))
                     else:
-                        await websocket.send(json.dumps({
+                        await websocket.send(_ws_dumps({
                             "type": "status",
                             "session_id": session_id,
                             "is_streaming": False,
@@ -1220,14 +1565,14 @@ async def websocket_handler(websocket) -> None:
                         }))
 
                 else:
-                    await websocket.send(json.dumps({
+                    await websocket.send(_ws_dumps({
                         "type": "error",
                         "error": "unknown_message_type",
                         "message": f"Unknown message type: {msg_type}"
                     }))
 
             except json.JSONDecodeError as e:
-                await websocket.send(json.dumps({
+                await websocket.send(_ws_dumps({
                     "type": "error",
                     "error": "invalid_json",
                     "message": f"Invalid JSON: {str(e)}"
@@ -1239,15 +1584,72 @@ async def websocket_handler(websocket) -> None:
             logger.info(f"WebSocket connection closed for session {session_id}")
         else:
             logger.error(f"WebSocket error: {e}")
-        if session_id and session_id in _streaming_sessions:
-            session = _streaming_sessions[session_id]
-            await websocket.send(json.dumps({
+        if _streaming_sessions.get(session_id) is not None:
+            await websocket.send(_ws_dumps({
                 "type": "error",
                 "error": "internal_error",
                 "message": str(e)
             }))
 
 
+# Streamed tokens are coalesced into one "token" frame per batch to cut
+# JSON encodes and send() calls; the frame's token field carries the
+# concatenated text, so clients append it exactly as a single token.
+TOKEN_BATCH_SIZE = 8
+TOKEN_BATCH_INTERVAL = 0.02
+
+
+class _TokenBatch:
+    """Accumulates streamed token text and sends it in coalesced frames."""
+
+    def __init__(self, websocket, session: StreamingSession):
+        self.websocket = websocket
+        self.session = session
+        self.texts: List[str] = []
+        self.first_index = 0
+        self.last_flush = time.monotonic()
+        # The envelopes are fixed for the whole stream, so only the token
+        # text, preview and counters are encoded per frame
+        self._prefix = '{"type": "token", "message_id": %s, "token": ' % json.dumps(session.message_id)
+        self._status_prefix = (
+            '{"type": "status", "session_id": %s, "is_streaming": true, "token_count": '
+            % json.dumps(session.session_id)
+        )
+
+    async def add(self, text: str) -> None:
+        """Queue a token, flushing when the batch is full or old enough."""
+        if not self.texts:
+            self.first_index = self.session.token_count - 1
+        self.texts.append(text)
+        if (len(self.texts) >= TOKEN_BATCH_SIZE
+                or time.monotonic() - self.last_flush >= TOKEN_BATCH_INTERVAL):
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Send any queued tokens as one frame."""
+        self.last_flush = time.monotonic()
+        if not self.texts:
+            return
+        text = "".join(self.texts)
+        self.texts.clear()
+        # The wall clock is read once per frame, not per token; last_token_time
+        # is therefore accurate to the batch interval
+        now = get_timestamp()
+        self.session.last_token_time = now
+        await self.websocket.send(
+            f'{self._prefix}{_ws_dumps(text)}, "token_index": {self.first_index}, '
+            f'"token_count": {self.session.token_count}, "timestamp": {now!r}}}'
+        )
+
+    async def send_status(self, preview_length: int = 200) -> None:
+        """Flush queued tokens, then send a status frame with a content preview."""
+        await self.flush()
+        await self.websocket.send(
+            f'{self._status_prefix}{self.session.token_count}, '
+            f'"accumulated_content": {_ws_dumps(self.session.content_prefix(preview_length))}}}'
+        )
+
+
 async def _stream_llm_response(websocket, session_id: str, content: str) -> None:
     """Stream LLM response tokens to the client.
 
@@ -1259,26 +1661,34 @@ async def _stream_llm_response(websocket, session_id: str, content: str) -> None
     session = StreamingSession(
         session_id=session_id,
         message_id=generate_id(),
-        accumulated_content="",
         last_token_time=get_timestamp(),
         token_count=0,
         is_streaming=True,
         cancel_requested=False
     )
 
-    _streaming_sessions[session_id] = session
+    _streaming_sessions.register(session)
 
+    # The user's message until the turn is committed; saved on its own if
+    # the stream fails before that
+    pending_user_message: Optional[Message] = None
     try:
         # Get session from database
         db_session = get_session(session_id)
         if db_session is None:
-            await websocket.send(json.dumps({
+            await websocket.send(_ws_dumps({
                 "type": "error",
                 "error": "session_not_found",
                 "message": f"Session {session_id} not found"
             }))
             return
 
+        # Resolve shared services once for the whole stream
+        token_estimator = get_token_estimator()
+        context_builder = get_context_builder(get_config())
+        llm = get_llm_provider()
+        llm_config = get_default_llm_config()
+
         # Get existing messages for context
         existing_messages = get_messages(session_id)
 
@@ -1288,76 +1698,80 @@ async def _stream_llm_response(websocket, session_id: str, content: str) -> None
             session_id=session_id,
             role="user",
             content=content,
-            token_count=get_token_estimator().count_tokens(content),
+            token_count=token_estimator.count_tokens(content),
             created_at=get_timestamp(),
         )
-        create_message(user_message)
-
-        # Build context for LLM
-        context_messages = [
-            ContextMessage(
-                role=m.role,
-                content=m.content or "",
-                token_count=m.token_count or 0,
-                created_at=m.created_at or 0,
-            )
-            for m in existing_messages
-        ]
-        context_messages.append(ContextMessage(
-            role="user",
-            content=content,
-            token_count=user_message.token_count or 0,
-            created_at=user_message.created_at or 0,
-        ))
+        pending_user_message = user_message
 
-        context_builder = get_context_builder(get_config())
+        # Build context for LLM; stored messages are passed straight through
         context = context_builder.build_context(
-            context_messages,
+            [*existing_messages, user_message],
             system_prompt=db_session.system_prompt
         )
 
-        # Get LLM provider
-        llm = get_llm_provider()
-        llm_config = LLMConfig(
-            max_tokens=get_config().llm.max_tokens,
-            temperature=get_config().llm.temperature,
-        )
-
         # Start streaming
         prompt = context_builder.format_for_llm(context)
 
-        async for token in llm.stream(prompt=prompt, config=llm_config):
-            # Check for cancellation
-            if session.cancel_requested:
-                break
+        # Greedy generations are deterministic, so a repeated prompt replays
+        # the tokens produced last time instead of running inference again
+        from .llm_cache import cache_key, is_cacheable
+        cache = get_llm_cache() if is_cacheable(llm_config) else None
+        key = None
+        cached_tokens = None
+        if cache is not None:
+            model = getattr(llm, "model_path", None)
+            key = cache_key(prompt, llm_config, str(model) if model is not None else None)
+            cached_tokens = cache.get(key)
+        if cached_tokens is not None:
+            token_source = _replay_tokens(cached_tokens)
+        else:
+            token_source = llm.stream(prompt=prompt, config=llm_config, preformatted=True)
+        batch = _TokenBatch(websocket, session)
 
-            # Send token to client
-            await websocket.send(json.dumps({
-                "type": "token",
-                "token": token.text,
-                "message_id": session.message_id,
-                "token_index": session.token_count,
-                "timestamp": get_timestamp()
-            }))
+        # Generation runs as its own task feeding a bounded queue, so the model
+        # keeps producing while frames are being sent; once the queue is full
+        # it waits for the client to catch up
+        import asyncio
+        queue: asyncio.Queue = asyncio.Queue(maxsize=TOKEN_QUEUE_SIZE)
+        producer = asyncio.create_task(_produce_tokens(token_source, queue))
 
-            # Update session state
-            session.accumulated_content += token.text
-            session.token_count += 1
-            session.last_token_time = get_timestamp()
-
-            # Send status update every 10 tokens for visual feedback
-            if session.token_count % 10 == 0:
-                await websocket.send(json.dumps({
-                    "type": "status",
-                    "session_id": session_id,
-                    "is_streaming": True,
-                    "token_count": session.token_count,
-                    "accumulated_content": session.accumulated_content[:200]
-                }))
+        try:
+            while (token := await queue.get()) is not _STREAM_END:
+                # Check for cancellation; the stream holds its StreamingSession
+                # directly, so the per-token path never touches the registry
+                if session.cancel_requested:
+                    break
+                # Update session state
+                session.chunks.append(token.text)
+                session.token_count += 1
+
+                # Queue the token; a frame goes out every TOKEN_BATCH_SIZE tokens
+                # or TOKEN_BATCH_INTERVAL seconds. send() blocks while the
+                # client's write buffer is above WS_WRITE_LIMIT, and the
+                # producer stalls once TOKEN_QUEUE_SIZE tokens are waiting
+                await batch.add(token.text)
+
+                # Send status update every 10 tokens for visual feedback
+                if session.token_count % 10 == 0:
+                    await batch.send_status()
+
+            await batch.flush()
+        finally:
+            # Stop generating if the client cancelled or sending failed
+            if not producer.done():
+                producer.cancel()
+        try:
+            # Re-raises any error from the model stream
+            await producer
+        except asyncio.CancelledError:
+            if not session.cancel_requested:
+                raise
 
-        # Check if cancelled
+        # Check if cancelled; the user's message is still kept
         if session.cancel_requested:
-            await websocket.send(json.dumps({
+            pending_user_message = None
+            _keep_user_message(user_message)
+            await websocket.send(_ws_dumps({
                 "type": "complete",
                 "message_id": session.message_id,
                 "accumulated_content": session.accumulated_content,
@@ -1366,25 +1780,30 @@ async def _stream_llm_response(websocket, session_id: str, content: str) -> None
             }))
             return
 
+        if cache is not None and cached_tokens is None:
+            cache.set(key, list(session.chunks))
+
+        # Join the generated text once for persistence and the final event
+        accumulated_content = session.accumulated_content
+
         # Create assistant message
         assistant_message = Message(
             id=generate_id(),
             session_id=session_id,
             role="assistant",
-            content=session.accumulated_content,
-            token_count=get_token_estimator().count_tokens(session.accumulated_content),
+            content=accumulated_content,
+            token_count=token_estimator.count_tokens(accumulated_content),
             created_at=get_timestamp(),
         )
-        create_message(assistant_message)
-
-        # Update session timestamp
-        update_session(session_id)
+        # Persist both messages and touch the session in one transaction
+        commit_chat_turn(user_message, assistant_message, session_id)
+        pending_user_message = None
 
         # Send completion event
-        await websocket.send(json.dumps({
+        await websocket.send(_ws_dumps({
             "type": "complete",
             "message_id": session.message_id,
-            "accumulated_content": session.accumulated_content,
+            "accumulated_content": accumulated_content,
             "token_count": session.token_count,
             "timestamp": get_timestamp()
         }))
@@ -1393,15 +1812,49 @@ async def _stream_llm_response(websocket, session_id: str, content: str) -> None
 
     except Exception as e:
         logger.error(f"Streaming error for session {session_id}: {e}")
-        await websocket.send(json.dumps({
+        _keep_user_message(pending_user_message)
+        await websocket.send(_ws_dumps({
             "type": "error",
             "error": "streaming_error",
             "message": str(e)
         }))
     finally:
         # Clean up session
-        if session_id in _streaming_sessions:
-            del _streaming_sessions[session_id]
+        _streaming_sessions.remove(session)
+
+
+# Maximum number of generated tokens buffered between the model and the socket
+TOKEN_QUEUE_SIZE = 64
+
+# Queue marker for the end of a token stream
+_STREAM_END = object()
+
+
+async def _produce_tokens(token_source, queue) -> None:
+    """Move tokens from a model stream into a bounded queue, then mark the end.
+
+    The end marker is queued even when the stream fails, so the consumer
+    always wakes up; the error is then raised when the task is awaited.
+    """
+    import asyncio
+    try:
+        async for token in token_source:
+            await queue.put(token)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        await queue.put(_STREAM_END)
+        raise
+    await queue.put(_STREAM_END)
+
+
+async def _replay_tokens(texts: List[str]):
+    """Yield cached token texts as StreamTokens, letting other tasks run in between."""
+    import asyncio
+    from .llm_adapter import StreamToken
+    for text in texts:
+        await asyncio.sleep(0)
+        yield StreamToken(text=text)
 
 
 def start_websocket_server(host: str = "0.0.0.0", port: int = 8765) -> None:
@@ -1420,15 +1873,31 @@ def start_websocket_server(host: str = "0.0.0.0", port: int = 8765) -> None:
         await websocket_handler(websocket)
 
     async def main():
-        async with serve(handler, host, port):
-            await asyncio.Future()  # run forever
+        reaper = asyncio.create_task(_reap_streaming_sessions())
+        try:
+            async with serve(handler, host, port, max_queue=WS_MAX_QUEUE, write_limit=WS_WRITE_LIMIT):
+                await asyncio.Future()  # run forever
+        finally:
+            reaper.cancel()
 
+    # Prefer uvloop's libuv-based loop when installed; it dispatches socket
+    # callbacks in C, which cuts the per-send wakeup cost while streaming
     try:
-        asyncio.run(main())
+        import uvloop
+        loop = uvloop.new_event_loop()
+        logger.info("Using uvloop event loop for WebSocket server")
+    except ImportError:
+        loop = asyncio.new_event_loop()
+
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(main())
     except KeyboardInterrupt:
         logger.info("WebSocket server stopped by user")
     except Exception as e:
         logger.error(f"WebSocket server error: {e}")
+    finally:
+        loop.close()
 
 
 # =============================================================================
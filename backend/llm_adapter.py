@@ -8,18 +8,26 @@ Design follows Requirement 7.1: Abstraction layer supporting multiple LLM provid
 """
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import AsyncIterator, Optional, List, Dict, Any
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import logging
+import os
 import threading
 import time
 
+from .llm_cache import LLMCache, cache_key, is_cacheable
+
+logger = logging.getLogger(__name__)
+
 
 # =============================================================================
 # Response Dataclasses - Provider-agnostic response format
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class LLMConfig:
     """Inference parameters for LLM generation."""
     max_tokens: int = 1024
@@ -29,8 +37,19 @@ class LLMConfig:
     stop_tokens: List[str] = field(default_factory=lambda: ["<|im_start|>", "<|im_end|>"])
     n_ctx: int = 4096
     n_batch: int = 512
-    n_threads: int = 8
-    n_gpu_layers: int = 0
+    # None: picked for this machine by default_inference_config()
+    n_threads: Optional[int] = None
+    n_gpu_layers: Optional[int] = None
+    # Tokens drafted per step for speculative decoding; 0 disables it
+    n_draft: int = 0
+    # Model memory placement; numa=None enables NUMA-aware allocation only
+    # on machines with more than one NUMA node
+    use_mmap: bool = True
+    use_mlock: bool = False
+    numa: Optional[bool] = None
+    # RAM budget for llama_cpp's prompt state cache (LlamaRAMCache); 0
+    # disables it and leaves prefix reuse to llama_cpp's own KV cache
+    prompt_cache_bytes: int = 0
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert config to dictionary for provider-specific parameters."""
@@ -45,7 +64,7 @@ class LLMConfig:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelInfo:
     """Model metadata for provider model listings."""
     id: str
@@ -68,7 +87,7 @@ class ModelInfo:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class ProviderStatus:
     """Connection status for LLM provider."""
     connected: bool
@@ -89,7 +108,7 @@ class ProviderStatus:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class StreamToken:
     """Token for streaming responses."""
     text: str
@@ -108,7 +127,7 @@ class StreamToken:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """Normalized response from LLM generation."""
     content: str
@@ -161,7 +180,8 @@ class LLMProvider(ABC):
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        config: Optional[LLMConfig] = None
+        config: Optional[LLMConfig] = None,
+        preformatted: bool = False
     ) -> LLMResponse:
         """Generate a non-streaming response.
 
@@ -169,6 +189,8 @@ class LLMProvider(ABC):
             prompt: The user input prompt
             system_prompt: Optional system context
             config: Optional inference parameters
+            preformatted: True if prompt is already a full ChatML prompt;
+                otherwise it is wrapped in one
 
         Returns:
             LLMResponse with generated content
@@ -180,7 +202,8 @@ class LLMProvider(ABC):
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        config: Optional[LLMConfig] = None
+        config: Optional[LLMConfig] = None,
+        preformatted: bool = False
     ) -> AsyncIterator[StreamToken]:
         """Generate a streaming response.
 
@@ -188,6 +211,8 @@ class LLMProvider(ABC):
             prompt: The user input prompt
             system_prompt: Optional system context
             config: Optional inference parameters
+            preformatted: True if prompt is already a full ChatML prompt;
+                otherwise it is wrapped in one
 
         Yields:
             StreamToken objects for each token generated
@@ -226,11 +251,115 @@ class LLMProvider(ABC):
         """Clean up provider resources and close connections."""
         pass
 
+    # -------------------------------------------------------------------------
+    # Shared HTTP client for remote providers
+    # -------------------------------------------------------------------------
+
+    # Pooled keep-alive client; created on first use, None for providers
+    # that never call get_http_client() (e.g. the in-process llama_cpp one)
+    _http_client = None
+
+    def get_http_client(self, base_url: str = "", timeout: float = 30.0):
+        """Get the provider's pooled httpx.AsyncClient, creating it on first use.
+
+        HTTP-backed providers should send every request through this client so
+        connections (and TLS sessions) are reused instead of reopened per call.
+
+        Args:
+            base_url: Base URL applied to relative request paths
+            timeout: Default request timeout in seconds
+
+        Returns:
+            httpx.AsyncClient shared by all calls on this provider
+        """
+        if self._http_client is None:
+            import httpx
+            self._http_client = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._http_client
+
+    async def aclose_http_client(self) -> None:
+        """Close the pooled HTTP client, if one was created."""
+        if self._http_client is not None:
+            client, self._http_client = self._http_client, None
+            await client.aclose()
+
 
 # =============================================================================
 # Local Model Provider - Wraps llama_cpp.Llama
 # =============================================================================
 
+# ChatML system block delimiters used to split off the cacheable prefix
+_SYSTEM_BLOCK_START = "<|im_start|>system\n"
+_BLOCK_END = "<|im_end|>\n"
+
+# Remaining pieces of the single-turn ChatML template
+_USER_BLOCK = _BLOCK_END + "<|im_start|>user\n"
+_ASSISTANT_START = _BLOCK_END + "<|im_start|>assistant\n"
+
+# Number of distinct system blocks whose token ids are kept
+_MAX_PREFIX_ENTRIES = 16
+
+# Chunks buffered between the llama_cpp worker thread and stream()
+STREAM_QUEUE_SIZE = 32
+
+# Queue item kinds passed from the worker thread to stream()
+_CHUNK_DATA = object()
+_CHUNK_ERROR = object()
+_CHUNK_END = object()
+
+
+def _numa_node_count() -> int:
+    """Count the NUMA nodes listed in sysfs (0 where sysfs is unavailable)."""
+    try:
+        return sum(
+            1 for name in os.listdir("/sys/devices/system/node")
+            if name.startswith("node") and name[4:].isdigit()
+        )
+    except OSError:
+        return 0
+
+
+def _numa_node_cpus(node: int) -> Optional[set]:
+    """Read the CPU ids of a NUMA node from sysfs (Linux only).
+
+    Args:
+        node: NUMA node number
+
+    Returns:
+        Set of CPU ids, or None if the node is unknown or sysfs is unavailable
+    """
+    try:
+        with open(f"/sys/devices/system/node/node{node}/cpulist") as f:
+            cpulist = f.read().strip()
+    except OSError:
+        return None
+
+    cpus = set()
+    for part in cpulist.split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus or None
+
+
+def _pin_inference_thread(cpus: Optional[set]) -> None:
+    """Executor initializer: pin the inference thread to a CPU set.
+
+    Threads llama.cpp spawns for decoding inherit the affinity, and the model
+    pages they first touch are allocated on the same NUMA node.
+    """
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError:
+            pass
+
+
 class LocalModelProvider(LLMProvider):
     """
     LLM provider for local llama_cpp models.
@@ -254,24 +383,50 @@ class LocalModelProvider(LLMProvider):
         self,
         model_path: str,
         system_prompt: str = "You are a helpful AI assistant.",
-        config: Optional[LLMConfig] = None
+        config: Optional[LLMConfig] = None,
+        response_cache: Optional[LLMCache] = None
     ):
         """Initialize the local model provider.
 
         Args:
             model_path: Path to the GGUF model file
             system_prompt: Default system prompt for conversations
-            config: Optional default inference configuration
+            config: Optional default inference configuration; device
+                settings it leaves unset are filled in by
+                default_inference_config()
+            response_cache: Optional cache answering repeated greedy
+                generate() calls
         """
         self.model_path = Path(model_path).expanduser()
         self.system_prompt = system_prompt
-        self.config = config or LLMConfig()
+        self.config = default_inference_config(config)
 
         # Internal state
         self._llm = None
         self._connected = False
         self._cancel_requested = False
         self._lock = threading.Lock()
+        # A llama_cpp context runs one generation at a time; this serializes
+        # callers from concurrent request threads
+        self._inference_lock = threading.Lock()
+        # In-flight deterministic generate() calls, keyed by prompt and
+        # sampling parameters, so identical concurrent requests share one run
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # Finished greedy generations, shared with the WebSocket stream path
+        self._response_cache = response_cache
+        # ChatML head (system block + user tag) of the last system prompt seen
+        self._chatml_head: tuple = (None, "")
+        # Token ids of recently seen ChatML system blocks, keyed by the block;
+        # only used on the inference thread
+        self._prefix_tokens: Dict[str, List[int]] = {}
+        # llama_cpp stopping criteria that abort decoding on cancel()
+        self._stopping_criteria = None
+        # Model file size, read once at connect() (the file is fixed while loaded)
+        self._model_size: Optional[int] = None
+        # Single long-lived thread that makes every llama_cpp call, so the
+        # model's working set stays warm in that core's caches
+        self._executor: Optional[ThreadPoolExecutor] = None
 
     def connect(self, **kwargs) -> bool:
         """Initialize the llama_cpp model.
@@ -288,16 +443,68 @@ class LocalModelProvider(LLMProvider):
             n_threads = kwargs.get("n_threads", self.config.n_threads)
             n_gpu_layers = kwargs.get("n_gpu_layers", self.config.n_gpu_layers)
             n_batch = kwargs.get("n_batch", self.config.n_batch)
+            use_mmap = kwargs.get("use_mmap", self.config.use_mmap)
+            use_mlock = kwargs.get("use_mlock", self.config.use_mlock)
+            # Spread model pages and threads over the NUMA nodes, so decode
+            # (memory-bound) reads from every node's memory controller
+            numa = kwargs.get("numa", self.config.numa)
+            if numa is None:
+                numa = _numa_node_count() > 1
+            # Forwarded only when given so llama_cpp's own default applies
+            extra = {key: kwargs[key] for key in ("n_threads_batch",) if key in kwargs}
+
+            # Speculative decoding: draft tokens by prompt lookup and let the
+            # model verify them in one batch (llama-cpp-python >= 0.2.59)
+            n_draft = kwargs.get("n_draft", self.config.n_draft)
+            if n_draft:
+                try:
+                    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+                    extra["draft_model"] = LlamaPromptLookupDecoding(num_pred_tokens=n_draft)
+                except ImportError:
+                    logger.warning("llama_cpp has no speculative decoding support; n_draft ignored")
+
+            # Optionally pin inference to one NUMA node's CPUs
+            numa_node = kwargs.get("numa_node")
+            cpus = _numa_node_cpus(numa_node) if numa_node is not None else None
+            self._executor = ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="llama-inference",
+                initializer=_pin_inference_thread,
+                initargs=(cpus,),
+            )
 
-            # Initialize the llama_cpp model
-            self._llm = Llama(
+            # Initialize the llama_cpp model on the inference thread, so the
+            # weights are first touched from the node it is pinned to
+            self._llm = self._executor.submit(
+                Llama,
                 model_path=str(self.model_path),
                 n_ctx=n_ctx,
                 n_threads=n_threads,
                 n_gpu_layers=n_gpu_layers,
                 n_batch=n_batch,
-                verbose=False
-            )
+                use_mmap=use_mmap,
+                use_mlock=use_mlock,
+                numa=numa,
+                verbose=False,
+                **extra
+            ).result()
+
+            # Optionally keep evaluated KV state for several recent prompts in
+            # RAM; llama_cpp already reuses the prefix of the previous call,
+            # and this adds a save_state() copy after every completion
+            cache_bytes = kwargs.get("prompt_cache_bytes", self.config.prompt_cache_bytes)
+            if cache_bytes:
+                from llama_cpp import LlamaRAMCache
+                self._llm.set_cache(LlamaRAMCache(capacity_bytes=cache_bytes))
+
+            # Checked by llama_cpp after every sampled token, so cancel()
+            # stops both generate() and stream() mid-decode
+            from llama_cpp import StoppingCriteriaList
+            self._stopping_criteria = StoppingCriteriaList([
+                lambda input_ids, logits: self._cancel_requested
+            ])
+
+            self._model_size = self.model_path.stat().st_size if self.model_path.exists() else None
 
             self._connected = True
             return True
@@ -309,13 +516,15 @@ class LocalModelProvider(LLMProvider):
             )
         except Exception as e:
             self._connected = False
+            self._shutdown_executor()
             raise RuntimeError(f"Failed to load model: {e}")
 
     def generate(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        config: Optional[LLMConfig] = None
+        config: Optional[LLMConfig] = None,
+        preformatted: bool = False
     ) -> LLMResponse:
         """Generate a non-streaming response.
 
@@ -323,6 +532,8 @@ class LocalModelProvider(LLMProvider):
             prompt: The user input prompt
             system_prompt: Optional system context (overrides default)
             config: Optional inference parameters
+            preformatted: True if prompt is already a full ChatML prompt;
+                otherwise it is wrapped in one
 
         Returns:
             LLMResponse with generated content
@@ -332,26 +543,30 @@ class LocalModelProvider(LLMProvider):
 
         cfg = config or self.config
 
-        # If prompt is already ChatML-formatted, use it directly
-        if prompt.startswith("<|im_start|>"):
-            full_prompt = prompt
-        else:
-            system = system_prompt or self.system_prompt
-            full_prompt = self._build_chatml_prompt(system, prompt)
-
-        start_time = time.time()
+        full_prompt = self._full_prompt(prompt, system_prompt, preformatted)
+
+        start_ns = time.monotonic_ns()
+
+        # Greedy decoding is deterministic, so a repeated request (retry,
+        # regenerate) is answered from the response cache
+        cache = self._response_cache if is_cacheable(cfg) else None
+        key = None
+        if cache is not None:
+            key = cache_key(full_prompt, cfg, str(self.model_path))
+            cached_tokens = cache.get(key)
+            if cached_tokens is not None:
+                # No tokens were evaluated for a cached answer
+                return LLMResponse(
+                    content="".join(cached_tokens),
+                    model=self.model_path.name,
+                    usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    response_time_ms=(time.monotonic_ns() - start_ns) // 1_000_000,
+                )
 
         # Generate response
-        response = self._llm(
-            full_prompt,
-            max_tokens=cfg.max_tokens,
-            temperature=cfg.temperature,
-            top_p=cfg.top_p,
-            stop=cfg.stop_tokens,
-            stream=False
-        )
+        response = self._generate_shared(full_prompt, cfg)
 
-        response_time_ms = int((time.time() - start_time) * 1000)
+        response_time_ms = (time.monotonic_ns() - start_ns) // 1_000_000
 
         # Extract content from response
         content = response["choices"][0]["text"]
@@ -359,7 +574,7 @@ class LocalModelProvider(LLMProvider):
         # Get finish reason
         finish_reason = response["choices"][0].get("finish_reason", None)
 
-        return LLMResponse(
+        result = LLMResponse(
             content=content,
             model=self.model_path.name,
             usage={
@@ -371,11 +586,18 @@ class LocalModelProvider(LLMProvider):
             response_time_ms=response_time_ms,
         )
 
+        # Partial output of a cancelled run is not a reusable answer
+        if cache is not None and finish_reason != "cancelled":
+            cache.set(key, [content])
+
+        return result
+
     async def stream(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
-        config: Optional[LLMConfig] = None
+        config: Optional[LLMConfig] = None,
+        preformatted: bool = False
     ) -> AsyncIterator[StreamToken]:
         """Generate a streaming response.
 
@@ -383,6 +605,8 @@ class LocalModelProvider(LLMProvider):
             prompt: The user input prompt
             system_prompt: Optional system context (overrides default)
             config: Optional inference parameters
+            preformatted: True if prompt is already a full ChatML prompt;
+                otherwise it is wrapped in one
 
         Yields:
             StreamToken objects for each token generated
@@ -392,51 +616,56 @@ class LocalModelProvider(LLMProvider):
 
         cfg = config or self.config
 
-        # If prompt is already ChatML-formatted, use it directly
-        if prompt.startswith("<|im_start|>"):
-            full_prompt = prompt
-        else:
-            system = system_prompt or self.system_prompt
-            full_prompt = self._build_chatml_prompt(system, prompt)
+        full_prompt = self._full_prompt(prompt, system_prompt, preformatted)
 
-        # Reset cancel flag
-        self._cancel_requested = False
-
-        # Start streaming generation
-        stream = self._llm(
-            full_prompt,
-            max_tokens=cfg.max_tokens,
-            temperature=cfg.temperature,
-            top_p=cfg.top_p,
-            stop=cfg.stop_tokens,
-            stream=True
+        # llama_cpp's stream is a blocking iterator, so it runs on a worker
+        # thread feeding a bounded queue; the event loop stays free between
+        # tokens and the thread pauses when the consumer falls behind
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stop = threading.Event()
+        producer = loop.run_in_executor(
+            self._executor, self._produce_chunks, full_prompt, cfg, loop, queue, stop
         )
 
-        accumulated_content = ""
         token_id = 0
+        finish_reason = None
 
-        for chunk in stream:
-            # Check for cancellation
-            if self._cancel_requested:
-                break
-
-            # Extract token from chunk
-            text = chunk["choices"][0]["text"]
-            token_id += 1
+        # Bound once; the loop body runs for every generated token
+        next_item = queue.get
+        make_token = StreamToken
 
-            accumulated_content += text
-
-            # Check if this is the final chunk
-            finish_reason = chunk["choices"][0].get("finish_reason", None)
-            is_complete = finish_reason is not None
-
-            yield StreamToken(
-                text=text,
-                token_id=token_id,
-                logprob=chunk["choices"][0].get("logprob", None),
-                is_complete=is_complete,
-                finish_reason=finish_reason,
-            )
+        try:
+            while True:
+                kind, chunk = await next_item()
+                if kind is _CHUNK_END:
+                    break
+                if kind is _CHUNK_ERROR:
+                    raise chunk
+
+                # Check for cancellation
+                if self._cancel_requested:
+                    break
+
+                # Extract token from chunk; finish_reason is only set on the
+                # final chunk
+                choice = chunk["choices"][0]
+                finish_reason = choice.get("finish_reason")
+                token_id += 1
+
+                yield make_token(
+                    text=choice["text"],
+                    token_id=token_id,
+                    logprob=choice.get("logprob"),
+                    is_complete=finish_reason is not None,
+                    finish_reason=finish_reason,
+                )
+        finally:
+            # Tell the worker to stop if we exit early (cancel, error, or the
+            # caller closing the generator), and wait for it to let go of the
+            # inference thread before the caller may close this event loop
+            stop.set()
+            await producer
 
         # Yield final completion signal
         if not self._cancel_requested:
@@ -447,6 +676,52 @@ class LocalModelProvider(LLMProvider):
                 finish_reason=finish_reason,
             )
 
+    def _produce_chunks(
+        self,
+        full_prompt: str,
+        cfg: LLMConfig,
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue,
+        stop: threading.Event,
+    ) -> None:
+        """Inference-thread side of stream(): run llama_cpp and hand chunks to the loop."""
+
+        def put(kind: object, item: Any = None) -> bool:
+            # Blocks while the queue is full; gives up once the consumer stopped
+            future = asyncio.run_coroutine_threadsafe(queue.put((kind, item)), loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except FutureTimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        try:
+            with self._inference_lock:
+                # Reset only once this run owns the model, so a cancel aimed
+                # at the generation holding the lock is not cleared
+                self._cancel_requested = False
+                stream = self._llm(
+                    self._encode_prompt(full_prompt),
+                    max_tokens=cfg.max_tokens,
+                    temperature=cfg.temperature,
+                    top_p=cfg.top_p,
+                    stop=cfg.stop_tokens,
+                    stopping_criteria=self._stopping_criteria,
+                    stream=True
+                )
+                for chunk in stream:
+                    if stop.is_set() or self._cancel_requested:
+                        break
+                    if not put(_CHUNK_DATA, chunk):
+                        break
+        except Exception as e:
+            put(_CHUNK_ERROR, e)
+            return
+        put(_CHUNK_END)
+
     def cancel(self) -> bool:
         """Cancel an ongoing generation.
 
@@ -470,16 +745,11 @@ class LocalModelProvider(LLMProvider):
         if not self._connected:
             return []
 
-        # Get model file size
-        model_size = None
-        if self.model_path.exists():
-            model_size = self.model_path.stat().st_size
-
         return [
             ModelInfo(
                 id=self.model_path.name,
                 name=self.model_path.stem,
-                size=model_size,
+                size=self._model_size,
                 context_length=self.config.n_ctx,
                 provider="llama_cpp",
             )
@@ -491,12 +761,12 @@ class LocalModelProvider(LLMProvider):
         Returns:
             ProviderStatus with connection details
         """
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
 
         try:
             # Test basic connectivity by checking if model is loaded
             if self._connected and self._llm is not None:
-                latency_ms = int((time.time() - start_time) * 1000)
+                latency_ms = (time.monotonic_ns() - start_ns) // 1_000_000
                 return ProviderStatus(
                     connected=True,
                     provider_name="llama_cpp",
@@ -523,6 +793,9 @@ class LocalModelProvider(LLMProvider):
         """Clean up provider resources and close connections."""
         self._cancel_requested = False
         self._connected = False
+        self._stopping_criteria = None
+        self._model_size = None
+        self._shutdown_executor()
         # Note: llama_cpp.Llama doesn't have an explicit close method
         # The object will be garbage collected
         self._llm = None
@@ -531,6 +804,146 @@ class LocalModelProvider(LLMProvider):
     # Helper Methods
     # =============================================================================
 
+    def _generate_shared(self, full_prompt: str, cfg: LLMConfig) -> Dict[str, Any]:
+        """Run a completion, letting identical concurrent greedy requests share it.
+
+        llama_cpp's high-level API cannot decode several prompts in one call,
+        so concurrent requests are serialized on the model. Requests that are
+        guaranteed to produce the same output (temperature 0, same prompt and
+        sampling parameters) wait for the run already in flight instead of
+        queueing a duplicate one.
+
+        Args:
+            full_prompt: ChatML-formatted prompt
+            cfg: Inference parameters
+
+        Returns:
+            Raw llama_cpp completion response
+        """
+        if not is_cacheable(cfg):
+            return self._complete(full_prompt, cfg)
+
+        key = cache_key(full_prompt, cfg, str(self.model_path))
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._inflight[key] = Future()
+
+        if not owner:
+            return pending.result()
+
+        try:
+            response = self._complete(full_prompt, cfg)
+            pending.set_result(response)
+            return response
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _complete(self, full_prompt: str, cfg: LLMConfig) -> Dict[str, Any]:
+        """Run one non-streaming completion on the inference thread."""
+        return self._executor.submit(self._run_completion, full_prompt, cfg).result()
+
+    def _run_completion(self, full_prompt: str, cfg: LLMConfig) -> Dict[str, Any]:
+        """Inference-thread side of _complete(), with exclusive use of the model.
+
+        Decodes through llama_cpp's streaming API and joins the chunks, so a
+        cancel() between tokens returns the partial text instead of waiting
+        for the full completion.
+
+        Returns:
+            Completion response in llama_cpp's non-streaming shape
+        """
+        parts: List[str] = []
+        finish_reason = None
+        with self._inference_lock:
+            self._cancel_requested = False
+            prompt_input = self._encode_prompt(full_prompt)
+            stream = self._llm(
+                prompt_input,
+                max_tokens=cfg.max_tokens,
+                temperature=cfg.temperature,
+                top_p=cfg.top_p,
+                stop=cfg.stop_tokens,
+                stopping_criteria=self._stopping_criteria,
+                stream=True
+            )
+            for chunk in stream:
+                choice = chunk["choices"][0]
+                parts.append(choice["text"])
+                finish_reason = choice.get("finish_reason")
+                if finish_reason is not None or self._cancel_requested:
+                    break
+
+            # Streamed chunks carry no usage, and one chunk may hold several
+            # tokens, so the returned text is tokenized to count them
+            content = "".join(parts)
+            prompt_tokens = len(prompt_input)
+            completion_tokens = len(
+                self._llm.tokenize(content.encode("utf-8"), add_bos=False, special=True)
+            ) if content else 0
+
+        if self._cancel_requested and finish_reason is None:
+            finish_reason = "cancelled"
+
+        return {
+            "choices": [{"text": content, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _shutdown_executor(self) -> None:
+        """Stop the inference thread after its queued jobs finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _encode_prompt(self, full_prompt: str) -> List[int]:
+        """Tokenize a ChatML prompt, reusing the tokens of its system block.
+
+        The leading system block is identical across turns of a session, so
+        its token ids are computed once and only the rest of the prompt is
+        tokenized per request. The split falls right after <|im_end|>\n,
+        where the next text starts with a special token, so the result is
+        the same as tokenizing the whole prompt. Runs on the inference
+        thread, like every other llama_cpp call.
+
+        Args:
+            full_prompt: ChatML-formatted prompt
+
+        Returns:
+            Token ids of the whole prompt
+        """
+        end = full_prompt.find(_BLOCK_END) if full_prompt.startswith(_SYSTEM_BLOCK_START) else -1
+        if end == -1:
+            return self._llm.tokenize(full_prompt.encode("utf-8"), add_bos=True, special=True)
+        end += len(_BLOCK_END)
+
+        block = full_prompt[:end]
+        prefix = self._prefix_tokens.get(block)
+        if prefix is None:
+            prefix = self._llm.tokenize(block.encode("utf-8"), add_bos=True, special=True)
+            if len(self._prefix_tokens) >= _MAX_PREFIX_ENTRIES:
+                self._prefix_tokens.pop(next(iter(self._prefix_tokens)))
+            self._prefix_tokens[block] = prefix
+
+        rest = self._llm.tokenize(full_prompt[end:].encode("utf-8"), add_bos=False, special=True)
+        return prefix + rest
+
+    def _full_prompt(self, prompt: str, system_prompt: Optional[str],
+                     preformatted: bool) -> str:
+        """Return the ChatML prompt to run, wrapping a plain user prompt."""
+        if preformatted:
+            return prompt
+        return self._build_chatml_prompt(system_prompt or self.system_prompt, prompt)
+
     def _build_chatml_prompt(self, system_prompt: str, user_prompt: str) -> str:
         """Build ChatML formatted prompt.
 
@@ -541,11 +954,12 @@ class LocalModelProvider(LLMProvider):
         Returns:
             Formatted prompt string
         """
-        return (
-            f"<|im_start|>system\n{system_prompt}<|im_end|>\n"
-            f"<|im_start|>user\n{user_prompt}<|im_end|>\n"
-            f"<|im_start|>assistant\n"
-        )
+        # The system prompt rarely changes, so its wrapped form is reused
+        cached_system, head = self._chatml_head
+        if cached_system != system_prompt:
+            head = _SYSTEM_BLOCK_START + system_prompt + _USER_BLOCK
+            self._chatml_head = (system_prompt, head)
+        return "".join((head, user_prompt, _ASSISTANT_START))
 
     @property
     def is_connected(self) -> bool:
@@ -557,10 +971,46 @@ class LocalModelProvider(LLMProvider):
 # Provider Factory
 # =============================================================================
 
+def default_inference_config(config: Optional[LLMConfig] = None) -> LLMConfig:
+    """Fill in the device settings a config leaves unset for this machine.
+
+    Offloads every layer when llama_cpp was built with GPU support, and uses
+    half the logical CPUs (roughly the physical cores) for decoding. Values
+    set in the config are kept.
+
+    Args:
+        config: Inference configuration; defaults to LLMConfig()
+
+    Returns:
+        LLMConfig with n_gpu_layers and n_threads filled in
+    """
+    config = config or LLMConfig()
+    defaults = {}
+    if config.n_gpu_layers is None:
+        try:
+            from llama_cpp import llama_supports_gpu_offload
+            gpu_offload = bool(llama_supports_gpu_offload())
+        except (ImportError, AttributeError):
+            gpu_offload = False
+        defaults["n_gpu_layers"] = -1 if gpu_offload else 0
+    if config.n_threads is None:
+        defaults["n_threads"] = max(1, (os.cpu_count() or 2) // 2)
+    if not defaults:
+        return config
+
+    config = replace(config, **defaults)
+    logger.info(
+        f"Inference defaults: n_gpu_layers={config.n_gpu_layers}, "
+        f"n_batch={config.n_batch}, n_threads={config.n_threads}"
+    )
+    return config
+
+
 def create_local_provider(
     model_path: str,
     system_prompt: str = "You are a helpful AI assistant.",
-    config: Optional[LLMConfig] = None
+    config: Optional[LLMConfig] = None,
+    response_cache: Optional[LLMCache] = None
 ) -> LocalModelProvider:
     """Factory function to create a local model provider.
 
@@ -568,6 +1018,7 @@ def create_local_provider(
         model_path: Path to the GGUF model file
         system_prompt: Default system prompt
         config: Optional inference configuration
+        response_cache: Optional cache for repeated greedy generations
 
     Returns:
         Configured LocalModelProvider instance
@@ -576,4 +1027,5 @@ def create_local_provider(
         model_path=model_path,
         system_prompt=system_prompt,
         config=config,
+        response_cache=response_cache,
     )
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Response cache for deterministic LLM generations.
+
+Generation at temperature 0 is deterministic for a given model, prompt and
+sampling parameters, so a repeated request can replay the tokens produced
+the first time instead of running inference again. Entries are kept in a
+bounded in-memory LRU and, optionally, in a SQLite table so they survive
+restarts.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .llm_adapter import LLMConfig
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_ENTRIES = 256
+
+
+def cache_key(prompt: str, config: "LLMConfig", model: Optional[str] = None) -> str:
+    """Build the cache key for a prompt and the parameters that affect its output.
+
+    Args:
+        prompt: Fully formatted prompt sent to the model
+        config: Sampling parameters for the generation
+        model: Identifier of the loaded model (e.g. its path)
+
+    Returns:
+        Hex SHA-256 digest identifying the generation
+    """
+    payload = json.dumps({
+        "prompt": prompt,
+        "model": model,
+        "temperature": config.temperature,
+        "top_p": config.top_p,
+        "top_k": config.top_k,
+        "max_tokens": config.max_tokens,
+        "stop": config.stop_tokens,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(config: "LLMConfig") -> bool:
+    """Only greedy (temperature 0) generations are reproducible."""
+    return config.temperature == 0
+
+
+class LLMCache:
+    """Bounded LRU of generated token lists, optionally backed by SQLite.
+
+    Thread-safe; the WebSocket server and HTTP handlers may share one instance.
+    """
+
+    def __init__(self, max_entries: int = _DEFAULT_MAX_ENTRIES, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, list[str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_path = Path(db_path).expanduser() if db_path else None
+        if self._db_path is not None:
+            self._init_db()
+
+    def get(self, key: str) -> Optional[list[str]]:
+        """Get the cached tokens for a key, or None on a miss."""
+        with self._lock:
+            tokens = self._entries.get(key)
+            if tokens is not None:
+                self._entries.move_to_end(key)
+                return tokens
+
+        if self._db_path is None:
+            return None
+        tokens = self._db_get(key)
+        if tokens is not None:
+            self._remember(key, tokens)
+        return tokens
+
+    def set(self, key: str, tokens: list[str]) -> None:
+        """Store the tokens produced for a key."""
+        self._remember(key, tokens)
+        if self._db_path is not None:
+            self._db_set(key, tokens)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries (persisted entries are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remember(self, key: str, tokens: list[str]) -> None:
+        with self._lock:
+            self._entries[key] = tokens
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self._db_path))
+
+    def _init_db(self) -> None:
+        self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    tokens TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _db_get(self, key: str) -> Optional[list[str]]:
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT tokens FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _db_set(self, key: str, tokens: list[str]) -> None:
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, tokens) VALUES (?, ?)",
+                    (key, json.dumps(tokens))
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
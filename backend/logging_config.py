@@ -1,50 +1,73 @@
 """Basic logging configuration for the backend."""
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
-from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
 
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+# Listener writing queued records to the real handlers, set by setup_logging()
+_listener: logging.handlers.QueueListener | None = None
+
 
 def setup_logging(
     level: str = "INFO",
-    log_file: Path | None = None,
+    log_file: "Path | None" = None,
     format: str = LOG_FORMAT,
     date_format: str = LOG_DATE_FORMAT,
+    force: bool = False,
 ) -> None:
     """Configure basic logging for the application.
 
+    Records are put on a queue by the root logger and written to the console
+    and log file by a background listener thread, so logging never blocks a
+    request on stdout or disk I/O. Repeated calls are no-ops unless ``force``
+    is set.
+
     Args:
         level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Optional path to log file
         format: Custom log format string
         date_format: Custom date format string
+        force: Reconfigure even if logging was already set up
     """
-    # Create formatter
-    formatter = logging.Formatter(format, date_format)
-
-    # Configure root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(level.upper())
+    global _listener
+    if _listener is not None:
+        if not force:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
 
-    # Clear existing handlers
-    root_logger.handlers.clear()
+    lvl = level.upper()
+    formatter = logging.Formatter(format, date_format)
 
     # Add console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    console_handler.setLevel(level.upper())
-    root_logger.addHandler(console_handler)
+    handlers: list[logging.Handler] = [console_handler]
 
     # Add file handler if log file specified
     if log_file:
         log_file.parent.mkdir(parents=True, exist_ok=True)
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(formatter)
-        file_handler.setLevel(level.upper())
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    # Root logger only enqueues; the listener does the actual writes
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Keep basicConfig from applying its own format before the listener's
+    queue_handler.setFormatter(logging.Formatter())
+    logging.basicConfig(level=lvl, handlers=[queue_handler], force=True)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
 
     # Reduce noise from third-party libraries
     logging.getLogger("httpx").setLevel("WARNING")
@@ -52,6 +75,13 @@ def setup_logging(
     logging.getLogger("uvicorn").setLevel("INFO")
 
 
+@atexit.register
+def _stop_listener() -> None:
+    """Flush queued log records on interpreter exit."""
+    if _listener is not None:
+        _listener.stop()
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger with the given name.
 
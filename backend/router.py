@@ -9,10 +9,9 @@ routes and methods.
 Design follows Requirement 14.7.
 """
 
-import re
 import logging
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, Callable, List, Tuple
+from typing import Optional, Set, Dict, Any, Callable, List, Tuple
 from http.server import BaseHTTPRequestHandler
 
 logger = logging.getLogger(__name__)
@@ -24,30 +23,17 @@ class Route:
     method: str
     path_pattern: str
     handler: Callable[[BaseHTTPRequestHandler, Dict[str, str], Dict[str, Any]], None]
-    # Compiled regex pattern for route matching (set after initialization)
-    regex_pattern: re.Pattern = field(init=False, repr=False)
-    # Parameter names extracted from path pattern
+    # Parameter names extracted from path pattern, in path order
     param_names: List[str] = field(init=False, repr=False)
 
     def __post_init__(self) -> None:
-        """Compile regex pattern and extract parameter names from path."""
-        # Convert path pattern like /api/v1/sessions/{id} to regex
-        # Escape special regex characters except { and }
-        escaped = re.escape(self.path_pattern)
-        # Replace {param_name} with named capture group
-        param_names: List[str] = []
-        regex = escaped
-        # Find all {param} patterns and replace with named groups
-        def replace_param(match: re.Match) -> str:
-            param_name = match.group(1)
-            param_names.append(param_name)
-            return r'(?P<' + param_name + r'>[^/]+)'
-        
-        regex = re.sub(r'\{(\w+)\}', replace_param, regex)
-        # Anchor the pattern to match full path
-        regex = '^' + regex + '$'
-        self.regex_pattern = re.compile(regex)
-        self.param_names = param_names
+        """Extract parameter names from the path pattern."""
+        # /api/v1/sessions/{id}/messages/{message_id} -> ["id", "message_id"]
+        self.param_names = [
+            segment[1:-1]
+            for segment in self.path_pattern.split('/')
+            if segment.startswith('{') and segment.endswith('}')
+        ]
 
 
 @dataclass
@@ -57,6 +43,20 @@ class RouteMatch:
     params: Dict[str, str]
 
 
+class _TrieNode:
+    """One path segment in the route trie."""
+
+    __slots__ = ("static", "param", "routes")
+
+    def __init__(self) -> None:
+        # Children keyed by literal segment text
+        self.static: Dict[str, "_TrieNode"] = {}
+        # Child matching any single segment ({param} placeholder)
+        self.param: Optional["_TrieNode"] = None
+        # Routes ending at this node, keyed by upper-cased method
+        self.routes: Dict[str, Route] = {}
+
+
 class Router:
     """
     Simple dictionary-based HTTP request router.
@@ -78,11 +78,12 @@ class Router:
 
     def __init__(self) -> None:
         """Initialize the router with empty routes dictionary."""
-        # Dictionary mapping (method, path) -> Route
-        # For parameter matching, we use a separate list of routes
+        # Dictionary mapping (method, path) -> Route for routes without
+        # parameters, checked before the trie
         self._routes: Dict[Tuple[str, str], Route] = {}
-        # List of routes for pattern matching with parameters
-        self._pattern_routes: List[Route] = []
+        # Trie of all routes by path segment, so a lookup walks the path once
+        # instead of testing every route
+        self._trie = _TrieNode()
         # Health check route (no prefix matching)
         self._health_route: Optional[Route] = None
 
@@ -102,16 +103,18 @@ class Router:
         """
         route = Route(method=method, path_pattern=path_pattern, handler=handler)
         
-        # Check if path has parameters
-        if '{' in path_pattern:
-            self._pattern_routes.append(route)
-            # Sort by number of static parts (more static = higher priority)
-            self._pattern_routes.sort(
-                key=lambda r: len(r.path_pattern.split('/')) - len(r.param_names),
-                reverse=True
-            )
-        else:
+        if '{' not in path_pattern:
             self._routes[(method.upper(), path_pattern)] = route
+
+        node = self._trie
+        for segment in path_pattern.split('/')[1:]:
+            if segment.startswith('{') and segment.endswith('}'):
+                if node.param is None:
+                    node.param = _TrieNode()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _TrieNode())
+        node.routes[method.upper()] = route
         
         logger.debug(f"Added route: {method} {path_pattern}")
 
@@ -133,16 +136,56 @@ class Router:
         if route:
             return RouteMatch(route=route, params={})
         
-        # Check for pattern match with parameters
-        for pattern_route in self._pattern_routes:
-            if pattern_route.method != method_upper:
+        return self.resolve(method_upper, path)[0]
+
+    def resolve(self, method: str, path: str) -> Tuple[Optional[RouteMatch], List[str]]:
+        """
+        Match a request and, if nothing matches, find the allowed methods.
+
+        Both answers come from one walk of the route trie, so a 405 response
+        needs no second lookup.
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE, etc.)
+            path: URL path to match
+
+        Returns:
+            Tuple of (RouteMatch or None, allowed methods for the path;
+            empty when a route matched)
+        """
+        method_upper = method.upper()
+        allowed: Set[str] = set()
+        for node, values in self._walk(path):
+            route = node.routes.get(method_upper)
+            if route is not None:
+                return RouteMatch(route=route, params=dict(zip(route.param_names, values))), []
+            allowed.update(node.routes)
+        return None, sorted(allowed)
+
+    def _walk(self, path: str):
+        """
+        Yield the trie nodes with routes that match a path.
+
+        Literal segments are tried before parameters, so more specific
+        routes come first. Each item is (node, parameter values in order).
+        """
+        segments = path.split('/')[1:]
+        depth = len(segments)
+        # Depth-first over (node, segment index, captured values); the param
+        # branch is pushed first so the static branch is explored first
+        stack = [(self._trie, 0, ())]
+        while stack:
+            node, index, values = stack.pop()
+            if index == depth:
+                if node.routes:
+                    yield node, values
                 continue
-            match = pattern_route.regex_pattern.match(path)
-            if match:
-                params = match.groupdict()
-                return RouteMatch(route=pattern_route, params=params)
-        
-        return None
+            segment = segments[index]
+            if node.param is not None and segment:
+                stack.append((node.param, index + 1, values + (segment,)))
+            child = node.static.get(segment)
+            if child is not None:
+                stack.append((child, index + 1, values))
 
     def get_allowed_methods(self, path: str) -> List[str]:
         """
@@ -154,19 +197,10 @@ class Router:
         Returns:
             List of allowed HTTP method strings
         """
-        allowed: List[str] = []
-        
-        # Check exact match routes
-        for (method, route_path), route in self._routes.items():
-            if route_path == path:
-                allowed.append(method)
-        
-        # Check pattern routes
-        for pattern_route in self._pattern_routes:
-            if pattern_route.regex_pattern.match(path):
-                allowed.append(pattern_route.method)
-        
-        return allowed
+        allowed: Set[str] = set()
+        for node, _ in self._walk(path):
+            allowed.update(node.routes)
+        return sorted(allowed)
 
     def add_health_route(
         self,
@@ -1,15 +1,24 @@
 """HTTP server entry point for the backend."""
+import email.utils
 import json
 import mimetypes
 import os
+import queue
 import signal
 import socket
+import stat
 import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
 from pathlib import Path
 from typing import Any, Dict
-from urllib.parse import urlparse, parse_qs
+from urllib.parse import unquote_plus
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from backend.config import Config, load_config
 from backend.database import init_db
@@ -25,6 +34,10 @@ _shutdown_event = threading.Event()
 # Project root for resolving frontend static files
 _PROJECT_ROOT = Path(__file__).parent.parent
 _FRONTEND_DIR = _PROJECT_ROOT / "frontend"
+# Resolved once; the containment check compares against it on every request
+_FRONTEND_DIR_RESOLVED = _FRONTEND_DIR.resolve()
+# The SPA shell, requested on every page load
+_INDEX_PATH = _FRONTEND_DIR_RESOLVED / "index.html"
 
 # Content type mapping for static files
 _CONTENT_TYPES = {
@@ -44,6 +57,137 @@ _CONTENT_TYPES = {
     ".map": "application/json",
 }
 
+# Assets that rarely change between releases may be reused for an hour;
+# everything else (HTML, JS, CSS) is revalidated with its ETag on each load
+_LONG_CACHE_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico",
+    ".woff", ".woff2", ".ttf", ".map",
+})
+_LONG_CACHE_CONTROL = "public, max-age=3600"
+_REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def _header_line(name: str, value: str) -> bytes:
+    """Encode one header line the way BaseHTTPRequestHandler.send_header does."""
+    return f"{name}: {value}\r\n".encode("latin-1", "strict")
+
+
+# Pre-encoded (Content-Type, Cache-Control) header lines per file extension
+_STATIC_HEADERS = {
+    ext: (
+        _header_line("Content-Type", content_type),
+        _header_line(
+            "Cache-Control",
+            _LONG_CACHE_CONTROL if ext in _LONG_CACHE_EXTENSIONS else _REVALIDATE_CACHE_CONTROL,
+        ),
+    )
+    for ext, content_type in _CONTENT_TYPES.items()
+}
+_DEFAULT_STATIC_HEADERS = (
+    _header_line("Content-Type", "application/octet-stream"),
+    _header_line("Cache-Control", _REVALIDATE_CACHE_CONTROL),
+)
+
+# CORS headers that are the same on every response
+_CORS_STATIC_HEADERS = (
+    _header_line("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
+    + _header_line("Access-Control-Allow-Headers", "Content-Type, Authorization")
+    + _header_line("Access-Control-Max-Age", "86400")
+)
+
+# Security headers sent on every response except CORS preflights
+_SECURITY_HEADERS = (
+    _header_line("X-Content-Type-Options", "nosniff")
+    + _header_line("X-Frame-Options", "DENY")
+    + _header_line("X-XSS-Protection", "1; mode=block")
+    + _header_line("Strict-Transport-Security", "max-age=31536000; includeSubDomains")
+)
+_JSON_CONTENT_TYPE_LINE = _header_line("Content-Type", "application/json")
+
+
+def _encode_json(data: Any) -> bytes:
+    """Serialize a response body compactly, preferring orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _error_blob(error: str, message: str) -> bytes:
+    """Encode the body and the headers that follow the CORS block of an error response."""
+    body = _encode_json({"error": error, "message": message})
+    return (
+        _SECURITY_HEADERS
+        + _JSON_CONTENT_TYPE_LINE
+        + _header_line("Content-Length", str(len(body)))
+        + b"\r\n"
+        + body
+    )
+
+
+# Error responses with a fixed message, pre-encoded from the security headers
+# through the body; misses from scanners and stale links are answered without
+# serializing anything
+_ERROR_BLOBS = {
+    key: _error_blob(*key)
+    for key in (
+        ("not_found", "Resource not found"),
+        ("forbidden", "Access denied"),
+        ("server_error", "Failed to read file"),
+    )
+}
+
+# Paths under this prefix are dispatched through the API router
+_API_PREFIX = "/api/"
+
+# Static files up to this size are read once and served from memory;
+# larger ones are sent with sendfile()
+_STATIC_CACHE_MAX_FILE = 1 << 20
+# Total size of the file contents kept in the LRU
+_STATIC_CACHE_BUDGET = 32 << 20
+
+# path -> (mtime_ns, size, contents), least recently used first
+_static_cache: "OrderedDict[str, tuple[int, int, bytes]]" = OrderedDict()
+_static_cache_bytes = 0
+_static_cache_lock = threading.Lock()
+
+
+def _load_static(path: str, st: os.stat_result) -> bytes:
+    """Get the contents of a small static file, reading it at most once per version.
+
+    Entries are reused while the file's mtime and size are unchanged. They
+    hold copies rather than maps, so a file rewritten while a response is
+    being sent cannot fault the process.
+
+    Args:
+        path: Resolved file path
+        st: Current stat result for the file
+
+    Returns:
+        Contents of the file
+    """
+    global _static_cache_bytes
+
+    with _static_cache_lock:
+        entry = _static_cache.get(path)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            _static_cache.move_to_end(path)
+            return entry[2]
+
+    with open(path, "rb") as f:
+        data = f.read()
+    size = len(data)
+
+    with _static_cache_lock:
+        old = _static_cache.pop(path, None)
+        if old is not None:
+            _static_cache_bytes -= old[1]
+        _static_cache[path] = (st.st_mtime_ns, size, data)
+        _static_cache_bytes += size
+        while _static_cache_bytes > _STATIC_CACHE_BUDGET and len(_static_cache) > 1:
+            _, (_, evicted_size, _) = _static_cache.popitem(last=False)
+            _static_cache_bytes -= evicted_size
+    return data
+
 
 def _make_handler_class(router: Router, config: Config):
     """Factory that creates a handler class with router and config baked in."""
@@ -53,6 +197,12 @@ def _make_handler_class(router: Router, config: Config):
 
         _router = router
         _config = config
+        # Buffer writes so the status line, headers and a small body leave in
+        # one send(); handle_one_request flushes after each request
+        wbufsize = 64 * 1024
+        # Allowed origins as a set, and the origin echoed for unknown ones
+        _cors_origins = frozenset(config.server.cors_origins)
+        _cors_fallback_origin = config.server.cors_origins[0] if config.server.cors_origins else "*"
         JSON_CONTENT_TYPE = "application/json"
 
         def log_message(self, format: str, *args) -> None:
@@ -62,20 +212,15 @@ def _make_handler_class(router: Router, config: Config):
         def _set_cors_headers(self) -> None:
             """Set CORS headers for frontend communication."""
             origin = self.headers.get("Origin", "*")
-            if origin != "*" and origin not in self._config.server.cors_origins:
-                origin = self._config.server.cors_origins[0] if self._config.server.cors_origins else "*"
+            if origin != "*" and origin not in self._cors_origins:
+                origin = self._cors_fallback_origin
 
             self.send_header("Access-Control-Allow-Origin", origin)
-            self.send_header("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
-            self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
-            self.send_header("Access-Control-Max-Age", "86400")
+            self._send_header_line(_CORS_STATIC_HEADERS)
 
         def _set_security_headers(self) -> None:
             """Set security headers for protection against common attacks."""
-            self.send_header("X-Content-Type-Options", "nosniff")
-            self.send_header("X-Frame-Options", "DENY")
-            self.send_header("X-XSS-Protection", "1; mode=block")
-            self.send_header("Strict-Transport-Security", "max-age=31536000; includeSubDomains")
+            self._send_header_line(_SECURITY_HEADERS)
 
         def _set_response_headers(self) -> None:
             """Set common response headers."""
@@ -84,44 +229,64 @@ def _make_handler_class(router: Router, config: Config):
 
         def _send_json_response(self, status_code: int, data: dict[str, Any] | list[Any]) -> None:
             """Send a JSON response with proper headers."""
+            body = _encode_json(data)
             self.send_response(status_code)
             self._set_response_headers()
             self.send_header("Content-Type", self.JSON_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
             self.end_headers()
-            self.wfile.write(json.dumps(data).encode("utf-8"))
+            self.wfile.write(body)
 
         def _send_error_response(self, status_code: int, error: str, message: str) -> None:
             """Send a JSON error response."""
-            self._send_json_response(status_code, {"error": error, "message": message})
+            blob = _ERROR_BLOBS.get((error, message))
+            if blob is None:
+                blob = _error_blob(error, message)
+            self.send_response(status_code)
+            self._set_cors_headers()
+            # The blob carries the rest of the headers, the blank line and the
+            # body, so the whole response goes out in one write
+            self._send_header_line(blob)
+            self.flush_headers()
 
         def _parse_request_path(self) -> tuple[str, Dict[str, Any]]:
-            """Parse the URL into path and query dict."""
-            parsed = urlparse(self.path)
-            path = parsed.path
-            query = {}
-            for key, values in parse_qs(parsed.query).items():
-                query[key] = values[0] if len(values) == 1 else values
+            """Parse the URL into path and query dict.
+
+            Matches parse_qs semantics for this API: pairs with blank values
+            are dropped and repeated keys collect into a list.
+            """
+            path, _, query_string = self.path.partition("#")[0].partition("?")
+            query: Dict[str, Any] = {}
+            if not query_string:
+                return path, query
+            for pair in query_string.split("&"):
+                key, sep, value = pair.partition("=")
+                if not sep or not value:
+                    continue
+                key = unquote_plus(key)
+                value = unquote_plus(value)
+                existing = query.get(key)
+                if existing is None:
+                    query[key] = value
+                elif isinstance(existing, list):
+                    existing.append(value)
+                else:
+                    query[key] = [existing, value]
             return path, query
 
         def _route_request(self, method: str) -> None:
             """Route an API request through the router, or serve static files."""
             path, query = self._parse_request_path()
 
-            # Health check (special route)
-            if self._router.match_health(method, path):
-                health_route = self._router._health_route
-                if health_route:
-                    health_route.handler(self, {}, query)
-                    return
-
-            # API routes
-            if path.startswith("/api/"):
-                match = self._router.match(method, path)
+            # API routes; checked first since they carry most of the traffic
+            # and can never be the health or a static path
+            if path.startswith(_API_PREFIX):
+                # One lookup yields the route, or the methods for a 405
+                match, allowed = self._router.resolve(method, path)
                 if match:
                     match.route.handler(self, match.params, query)
                 else:
                     # Check if path exists but method not allowed
-                    allowed = self._router.get_allowed_methods(path)
                     if allowed:
                         self._send_error_response(405, "method_not_allowed",
                                                   f"Method {method} not allowed. Allowed: {', '.join(allowed)}")
@@ -129,6 +294,13 @@ def _make_handler_class(router: Router, config: Config):
                         self._send_error_response(404, "not_found", "Resource not found")
                 return
 
+            # Health check (special route)
+            if self._router.match_health(method, path):
+                health_route = self._router._health_route
+                if health_route:
+                    health_route.handler(self, {}, query)
+                    return
+
             # Non-API paths: serve static files (GET only)
             if method == "GET":
                 self._serve_static(path)
@@ -137,43 +309,119 @@ def _make_handler_class(router: Router, config: Config):
 
         def _serve_static(self, path: str) -> None:
             """Serve static files from the frontend directory."""
-            # Map root to index.html
-            if path == "/":
+            # The root and index.html map to a fixed path, so the most common
+            # request skips path resolution and the containment check
+            if path == "/" or path == "/index.html":
                 path = "/index.html"
+                file_path = _INDEX_PATH
+                content_type_line, cache_control_line = _STATIC_HEADERS[".html"]
+            else:
+                # Resolve the file path safely
+                # Remove leading slash and normalize
+                relative_path = path.lstrip("/")
+                file_path = (_FRONTEND_DIR_RESOLVED / relative_path).resolve()
+
+                # Security: ensure the resolved path is within the frontend directory
+                try:
+                    file_path.relative_to(_FRONTEND_DIR_RESOLVED)
+                except ValueError:
+                    self._send_error_response(403, "forbidden", "Access denied")
+                    return
 
-            # Resolve the file path safely
-            # Remove leading slash and normalize
-            relative_path = path.lstrip("/")
-            file_path = (_FRONTEND_DIR / relative_path).resolve()
+                # Determine content type
+                _, dot, ext = file_path.name.rpartition(".")
+                ext = "." + ext if dot else ""
+                if not ext.islower():
+                    ext = ext.lower()
+                content_type_line, cache_control_line = _STATIC_HEADERS.get(ext, _DEFAULT_STATIC_HEADERS)
 
-            # Security: ensure the resolved path is within the frontend directory
+            # One stat serves the existence check, the validators and the
+            # Content-Length
             try:
-                file_path.relative_to(_FRONTEND_DIR.resolve())
-            except ValueError:
-                self._send_error_response(403, "forbidden", "Access denied")
-                return
-
-            if not file_path.is_file():
+                st = os.stat(file_path)
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISREG(st.st_mode):
                 self._send_error_response(404, "not_found", f"File not found: {path}")
                 return
 
-            # Determine content type
-            ext = file_path.suffix.lower()
-            content_type = _CONTENT_TYPES.get(ext, "application/octet-stream")
-
-            try:
-                with open(file_path, "rb") as f:
-                    content = f.read()
-
-                self.send_response(200)
+            # Validators for conditional GETs; a client holding the current
+            # copy gets an empty 304 instead of the body
+            etag = f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+            if self._is_not_modified(etag, st.st_mtime):
+                self.send_response(304)
                 self._set_security_headers()
-                self.send_header("Content-Type", content_type)
-                self.send_header("Content-Length", str(len(content)))
+                self.send_header("ETag", etag)
+                self._send_header_line(cache_control_line)
                 self.end_headers()
-                self.wfile.write(content)
+                return
+
+            headers_sent = False
+            try:
+                # Small files come from the in-memory cache; larger ones are
+                # copied from the page cache to the socket by the kernel
+                if st.st_size <= _STATIC_CACHE_MAX_FILE:
+                    content = _load_static(str(file_path), st)
+                    self._send_static_headers(content_type_line, cache_control_line, len(content), etag, st)
+                    headers_sent = True
+                    self.wfile.write(content)
+                else:
+                    size = st.st_size
+                    # Unbuffered: the kernel reads the file, Python never does
+                    with open(file_path, "rb", buffering=0) as f:
+                        self._send_static_headers(content_type_line, cache_control_line, size, etag, st)
+                        headers_sent = True
+                        self.wfile.flush()
+                        sent = self.connection.sendfile(f, 0, size)
+                    if sent < size:
+                        # Truncated since the stat; the client must not wait
+                        # for the missing bytes
+                        logger.warning(f"Static file {file_path} shrank while being sent")
+                        self.close_connection = True
             except OSError as e:
                 logger.error(f"Error serving static file {file_path}: {e}")
-                self._send_error_response(500, "server_error", "Failed to read file")
+                # Once the body has started, the response can only be cut short
+                if not headers_sent:
+                    self._send_error_response(500, "server_error", "Failed to read file")
+
+        def _send_static_headers(self, content_type_line: bytes, cache_control_line: bytes,
+                                 size: int, etag: str, st: os.stat_result) -> None:
+            """Send the status line and headers of a 200 static file response."""
+            self.send_response(200)
+            self._set_security_headers()
+            self._send_header_line(content_type_line)
+            self.send_header("Content-Length", str(size))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", email.utils.formatdate(st.st_mtime, usegmt=True))
+            self._send_header_line(cache_control_line)
+            self.end_headers()
+
+        def _send_header_line(self, line: bytes) -> None:
+            """Queue an already-encoded header line (see _header_line)."""
+            if not hasattr(self, "_headers_buffer"):
+                self._headers_buffer = []
+            self._headers_buffer.append(line)
+
+        def _is_not_modified(self, etag: str, mtime: float) -> bool:
+            """Check the request's conditional headers against a file's validators."""
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                if if_none_match.strip() == "*":
+                    return True
+                return etag in (tag.strip() for tag in if_none_match.split(","))
+
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    since = email.utils.parsedate_to_datetime(if_modified_since)
+                except (TypeError, ValueError):
+                    return False
+                # HTTP dates are GMT; a -0000 or unparsed zone comes back naive
+                if since.tzinfo is None:
+                    since = since.replace(tzinfo=timezone.utc)
+                return int(mtime) <= since.timestamp()
+            return False
 
         def do_OPTIONS(self) -> None:
             """Handle CORS preflight requests."""
@@ -200,6 +448,45 @@ def _make_handler_class(router: Router, config: Config):
     return ChatRequestHandler
 
 
+class _PooledHTTPServer(ThreadingHTTPServer):
+    """HTTP server handling connections on a fixed pool of daemon threads.
+
+    Static file and API requests run in parallel instead of queueing behind
+    each other, while the thread count stays bounded under load. The
+    threads are daemonic so shutdown never waits on a slow client.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, max_threads: int):
+        super().__init__(server_address, handler_class)
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._workers = [
+            threading.Thread(target=self._work, name=f"http-worker-{i}", daemon=True)
+            for i in range(max(1, max_threads))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _work(self) -> None:
+        """Worker loop: handle accepted connections until a None sentinel."""
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            self.process_request_thread(*item)
+
+    def process_request(self, request, client_address) -> None:
+        """Hand an accepted connection to the worker pool."""
+        self._pending.put((request, client_address))
+
+    def server_close(self) -> None:
+        """Close the listening socket and let idle workers exit."""
+        super().server_close()
+        for _ in self._workers:
+            self._pending.put(None)
+
+
 def _run_server(config: Config) -> None:
     """Run the HTTP server.
 
@@ -216,12 +503,13 @@ def _run_server(config: Config) -> None:
 
     # Create server instance
     server_address = (config.server.host, config.server.port)
-    _server = HTTPServer(server_address, handler_class)
+    _server = _PooledHTTPServer(server_address, handler_class, config.server.http_threads)
 
     # Make socket reusable
     _server.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
     logger.info(f"Server starting on {config.server.host}:{config.server.port}")
+    logger.info(f"HTTP worker threads: {config.server.http_threads}")
     logger.info(f"Debug mode: {config.server.debug}")
     logger.info(f"Serving frontend from {_FRONTEND_DIR}")
 
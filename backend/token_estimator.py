@@ -16,8 +16,22 @@ logger = logging.getLogger(__name__)
 # GPT/Llama-family models average ~3.5-4.5 chars per token.
 _CHARS_PER_TOKEN = 4.0
 
-
-@dataclass
+# Chat roles; their estimates are computed once instead of once per message
+_CHAT_ROLES = ("system", "user", "assistant", "tool")
+
+# Token multiplier per file type, in basis points: code and JSON split into
+# more tokens per character than prose. Other types count as plain text.
+_FILE_TYPE_MULTIPLIERS = {
+    "code": 10500,
+    "python": 10500,
+    "javascript": 10500,
+    "rust": 10500,
+    "go": 10500,
+    "json": 10200,
+}
+
+
+@dataclass(slots=True)
 class TokenEstimatorConfig:
     """Configuration for the token estimator."""
     chars_per_token: float = _CHARS_PER_TOKEN
@@ -34,37 +48,55 @@ class TokenEstimator:
 
     def __init__(self, config: Optional[TokenEstimatorConfig] = None):
         self.config = config or TokenEstimatorConfig()
+        # For a whole chars_per_token c, round(n / c) == (2n + c) // 2c, so
+        # counting needs no float division; 0 means use the float formula
+        chars = self.config.chars_per_token
+        self._int_chars = int(chars) if chars == int(chars) and chars >= 1 else 0
+        self._role_tokens = {role: self.count_tokens(role) for role in _CHAT_ROLES}
 
     def count_tokens(self, text: str, model: str = "default") -> int:
         """Estimate token count for a text string."""
         if not text:
             return 0
+        chars = self._int_chars
+        if chars:
+            return max(1, (2 * len(text) + chars) // (2 * chars))
         return max(1, int(len(text) / self.config.chars_per_token + 0.5))
 
+    def count_role_tokens(self, role: str, model: str = "default") -> int:
+        """Estimate tokens for a message role, looking up the standard roles."""
+        tokens = self._role_tokens.get(role)
+        if tokens is None:
+            return self.count_tokens(role, model)
+        return tokens
+
     def count_messages(self, messages: list[dict[str, str]], model: str = "default") -> int:
         """Estimate tokens for a list of chat messages including formatting overhead."""
         if not messages:
             return 0
-        total = 0
-        for message in messages:
-            role = message.get("role", "")
-            content = message.get("content", "")
-            total += 3  # formatting tokens per message
-            total += self.count_tokens(role, model)
-            total += self.count_tokens(content, model)
-        total += 3  # final separator
-        return total
+        # The estimate is a pure character ratio, so the text of all messages
+        # is measured in one pass and converted (and rounded) once
+        total_chars = sum(
+            len(message.get("role", "")) + len(message.get("content", ""))
+            for message in messages
+        )
+        chars = self._int_chars
+        if chars:
+            text_tokens = (2 * total_chars + chars) // (2 * chars)
+        else:
+            text_tokens = int(total_chars / self.config.chars_per_token + 0.5)
+        # 3 formatting tokens per message, plus 3 for the final separator
+        return 3 * len(messages) + 3 + text_tokens
 
     def count_file_content(self, content: str, file_type: str = "text", model: str = "default") -> int:
         """Estimate tokens for file content."""
         if not content:
             return 0
         base = self.count_tokens(content, model)
-        if file_type in ("code", "python", "javascript", "rust", "go"):
-            return int(base * 1.05)
-        elif file_type == "json":
-            return int(base * 1.02)
-        return base
+        multiplier = _FILE_TYPE_MULTIPLIERS.get(file_type)
+        if multiplier is None:
+            return base
+        return base * multiplier // 10000
 
     def estimate_tokens_for_limit(self, text: str, max_tokens: int, model: str = "default") -> tuple[int, bool]:
         """Estimate tokens and check if within limit."""
@@ -88,7 +120,12 @@ def count_tokens(text: str, model: str = "default") -> int:
     """Module-level convenience function."""
     if not text:
         return 0
-    return max(1, int(len(text) / _CHARS_PER_TOKEN + 0.5))
+    # Same as int(len / 4.0 + 0.5) for the default 4 chars per token
+    return max(1, (len(text) + 2) >> 2)
+
+
+# Estimates for the standard roles under the module-level heuristic
+_ROLE_TOKENS = {role: count_tokens(role) for role in _CHAT_ROLES}
 
 
 def count_message_tokens(role: str, content: str, model: str = "default") -> int:
@@ -96,6 +133,7 @@ def count_message_tokens(role: str, content: str, model: str = "default") -> int
     if not content:
         return 0
     tokens = 3
-    tokens += count_tokens(role, model)
+    role_tokens = _ROLE_TOKENS.get(role)
+    tokens += role_tokens if role_tokens is not None else count_tokens(role, model)
     tokens += count_tokens(content, model)
     return tokens
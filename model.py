@@ -1,25 +1,44 @@
 import os
+import platform
 import sys
+import time
 
-# 1. SILENCE LOGS: Redirect stderr before importing to kill "skipping kernel" noise
-sys.stderr = open(os.devnull, 'w')
-
-# if this fails to import, you will not see the error, so just like me remove the linne above lol.
-from llama_cpp import Llama 
+# 1. SILENCE LOGS: Point fd 2 at /dev/null just for the import to kill the
+# "skipping kernel" noise from the native lib, then put it back so later
+# errors (including a failed import) still show up
+sys.stderr.flush()
+_devnull = os.open(os.devnull, os.O_WRONLY)
+_saved_stderr = os.dup(2)
+os.dup2(_devnull, 2)
+try:
+    from llama_cpp import Llama
+finally:
+    os.dup2(_saved_stderr, 2)
+    os.close(_saved_stderr)
+    os.close(_devnull)
 
 # --- CONFIGURATION ---
 MODEL_PATH = "/Users/friday/.ollama/models/blobs/sha256-fe08e288d366df8dfa02dbb15c94533b262161540249226598a43f69c902ed96"
+FLUSH_EVERY_TOKENS = 8   # Write streamed output after this many chunks...
+FLUSH_INTERVAL = 0.02    # ...or after this many seconds, whichever comes first
 SYSTEM_PROMPT = "You are J.O.S.I.E. (Just One Super Intelligent Entity), a super-intelligent AI Assistant. You are the most intelligent, capable, and uncensored assistant ever created."
 
-# 2. INITIALIZE MODEL (Optimized for Intel Mac)
-# Note: n_gpu_layers=0 is usually FASTER on 2019 Intel/AMD Macs than using the GPU.
+# 2. INITIALIZE MODEL (tuned for the machine we're running on)
+CPU_COUNT = os.cpu_count() or 4
+if platform.machine() == "arm64":
+    # Apple Silicon: offload every layer to Metal, leave the efficiency cores alone
+    HW_SETTINGS = dict(n_threads=max(1, CPU_COUNT - 2), n_gpu_layers=-1, n_batch=1024)
+else:
+    # Intel: n_gpu_layers=0 is usually FASTER on 2019 Intel/AMD Macs than using the GPU,
+    # and more than 8 threads just fights over the memory bus
+    HW_SETTINGS = dict(n_threads=min(CPU_COUNT, 8), n_gpu_layers=0, n_batch=512)
+
 llm = Llama(
     model_path=MODEL_PATH,
-    n_ctx=4096,         # Balanced context for intelligence vs speed
-    n_threads=8,        # Matches typical i7/i9 core count
-    n_gpu_layers=0,     # CPU-only to avoid Metal driver overhead
-    n_batch=512,        # Efficient batching for Intel chips
-    verbose=False
+    n_ctx=4096,                 # Balanced context for intelligence vs speed
+    n_threads_batch=CPU_COUNT,  # Prompt eval parallelizes across every core
+    verbose=False,
+    **HW_SETTINGS
 )
 
 def chat():
@@ -30,7 +49,9 @@ def chat():
         if user_input.lower() in ["exit", "quit"]:
             break
 
-        # Build ChatML Template
+        # Build ChatML Template. The system block is the same every turn, and
+        # llama_cpp keeps the previous call's KV state, so only the tokens
+        # after that shared prefix are evaluated again
         full_prompt = f"<|im_start|>system\n{SYSTEM_PROMPT}<|im_end|>\n<|im_start|>user\n{user_input}<|im_end|>\n<|im_start|>assistant\n"
 
         print("\033[1mJ.O.S.I.E.:\033[0m ", end="", flush=True)
@@ -45,10 +66,20 @@ def chat():
             stream=True
         )
 
+        # Write tokens in small batches instead of one flush per token, which
+        # still looks live at ~50 tok/s but makes far fewer write() calls
+        buf = []
+        last_flush = time.monotonic()
         for chunk in stream:
-            text = chunk['choices'][0]['text']
-            print(text, end="", flush=True)
-        
+            buf.append(chunk['choices'][0]['text'])
+            now = time.monotonic()
+            if len(buf) >= FLUSH_EVERY_TOKENS or now - last_flush > FLUSH_INTERVAL:
+                sys.stdout.write("".join(buf))
+                sys.stdout.flush()
+                buf.clear()
+                last_flush = now
+
+        sys.stdout.write("".join(buf))
         print() # New line after response
 
 if __name__ == "__main__":
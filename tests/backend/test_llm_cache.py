@@ -0,0 +1,43 @@
+"""Unit tests for the LLM response cache."""
+from dataclasses import replace
+
+from backend.llm_adapter import LLMConfig
+from backend.llm_cache import LLMCache, cache_key, is_cacheable
+
+
+class TestCacheKey:
+    """Tests for cache key derivation."""
+
+    def test_same_inputs_same_key(self):
+        config = LLMConfig(temperature=0)
+        assert cache_key("prompt", config, "m") == cache_key("prompt", replace(config), "m")
+
+    def test_sampling_params_change_key(self):
+        config = LLMConfig(temperature=0)
+        key = cache_key("prompt", config, "m")
+        assert cache_key("prompt", replace(config, max_tokens=7), "m") != key
+        assert cache_key("prompt", config, "other") != key
+        assert cache_key("prompt!", config, "m") != key
+
+    def test_only_greedy_is_cacheable(self):
+        assert is_cacheable(LLMConfig(temperature=0))
+        assert not is_cacheable(LLMConfig(temperature=0.7))
+
+
+class TestLLMCache:
+    """Tests for the LRU and SQLite layers."""
+
+    def test_lru_eviction(self):
+        cache = LLMCache(max_entries=2)
+        cache.set("a", ["1"])
+        cache.set("b", ["2"])
+        cache.get("a")
+        cache.set("c", ["3"])
+        assert cache.get("b") is None
+        assert cache.get("a") == ["1"]
+        assert cache.get("c") == ["3"]
+
+    def test_sqlite_persistence(self, tmp_path):
+        db_path = str(tmp_path / "cache.db")
+        LLMCache(db_path=db_path).set("k", ["hel", "lo"])
+        assert LLMCache(db_path=db_path).get("k") == ["hel", "lo"]
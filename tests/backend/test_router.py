@@ -0,0 +1,61 @@
+"""Unit tests for the HTTP router."""
+from backend.router import Router
+
+
+def _handler(request, params, body):
+    pass
+
+
+def _router() -> Router:
+    router = Router()
+    router.add_route("GET", "/api/v1/sessions", _handler)
+    router.add_route("GET", "/api/v1/sessions/{id}", _handler)
+    router.add_route("DELETE", "/api/v1/sessions/{id}", _handler)
+    router.add_route("GET", "/api/v1/sessions/{id}/messages", _handler)
+    router.add_route("PUT", "/api/v1/sessions/{id}/messages/{message_id}", _handler)
+    return router
+
+
+class TestRouterMatch:
+    """Tests for route matching."""
+
+    def test_exact_route(self):
+        match = _router().match("GET", "/api/v1/sessions")
+        assert match.route.path_pattern == "/api/v1/sessions"
+        assert match.params == {}
+
+    def test_pattern_route_params(self):
+        router = _router()
+        match = router.match("GET", "/api/v1/sessions/abc/messages")
+        assert match.route.path_pattern == "/api/v1/sessions/{id}/messages"
+        assert match.params == {"id": "abc"}
+
+        match = router.match("put", "/api/v1/sessions/abc/messages/42")
+        assert match.route.method == "PUT"
+        assert match.params == {"id": "abc", "message_id": "42"}
+
+    def test_no_match(self):
+        router = _router()
+        assert router.match("POST", "/api/v1/sessions/abc") is None
+        assert router.match("GET", "/api/v1/sessions/abc/other") is None
+        assert router.match("PATCH", "/api/v1/sessions/abc") is None
+
+
+class TestAllowedMethods:
+    """Tests for the 405 allowed-methods lookup."""
+
+    def test_exact_and_pattern_paths(self):
+        router = _router()
+        assert router.get_allowed_methods("/api/v1/sessions") == ["GET"]
+        assert router.get_allowed_methods("/api/v1/sessions/abc") == ["DELETE", "GET"]
+        assert router.get_allowed_methods("/unknown") == []
+
+    def test_resolve_returns_allowed_methods_on_miss(self):
+        router = _router()
+        match, allowed = router.resolve("POST", "/api/v1/sessions/abc")
+        assert match is None
+        assert allowed == ["DELETE", "GET"]
+
+        match, allowed = router.resolve("GET", "/api/v1/sessions/abc")
+        assert match.params == {"id": "abc"}
+        assert allowed == []
@@ -0,0 +1,60 @@
+"""Unit tests for message search."""
+import pytest
+
+from backend import database
+from backend.database import Message, Session, create_message, create_session, init_db, search_messages
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "chat.db"))
+    monkeypatch.setattr(database, "_fts_indexes", None)
+    init_db()
+    create_session(Session(id="s1", name="Chat", created_at=0.0, updated_at=0.0))
+
+
+def _add(message_id: str, content: str) -> None:
+    create_message(Message(id=message_id, session_id="s1", role="user", content=content, created_at=0.0))
+
+
+def _search(query: str) -> list[str]:
+    matches, total = search_messages(query)
+    assert total == len(matches)
+    return sorted(msg.id for msg, _ in matches)
+
+
+class TestSearchMessages:
+    """Tests for substring search over message content."""
+
+    def test_short_queries_match_mid_word(self, db):
+        _add("m1", "The cat sat")
+        _add("m2", "Café au lait")
+        _add("m3", "nothing here")
+        assert _search("t") == ["m1", "m2", "m3"]
+        assert _search("at") == ["m1"]
+        assert _search("é") == ["m2"]
+        assert _search("fé") == ["m2"]
+        assert _search("ca") == ["m1", "m2"]
+        assert _search("afé") == ["m2"]
+
+    def test_matches_like_a_lowercase_substring_scan(self, db):
+        contents = {
+            "m1": "Hello World",
+            "m2": "the worldwide web",
+            "m3": "İstanbul trip?!?",
+            "m4": "nothing here",
+        }
+        for message_id, content in contents.items():
+            _add(message_id, content)
+        for query in ("orld", "WORLD", "hello world", "i̇st", "ist", "?!?", "!?", "web", "xyz"):
+            expected = sorted(m for m, c in contents.items() if query.lower() in c.lower())
+            assert _search(query) == expected, query
+
+    def test_session_filter_and_limit(self, db):
+        create_session(Session(id="s2", name="Other", created_at=0.0, updated_at=1.0))
+        _add("m1", "shared text")
+        create_message(Message(id="m2", session_id="s2", role="user", content="shared too", created_at=0.0))
+        matches, total = search_messages("shared", limit=1)
+        assert total == 2 and [msg.id for msg, _ in matches] == ["m2"]
+        matches, total = search_messages("shared", session_id="s1")
+        assert [(msg.id, name) for msg, name in matches] == [("m1", "Chat")]
@@ -0,0 +1,52 @@
+"""Unit tests for the heuristic token estimator."""
+from backend.token_estimator import TokenEstimator, TokenEstimatorConfig, count_tokens
+
+
+class TestCountTokens:
+    """Tests for single-text estimates."""
+
+    def test_rounds_to_nearest_token(self):
+        estimator = TokenEstimator()
+        assert estimator.count_tokens("") == 0
+        assert estimator.count_tokens("a") == 1
+        assert estimator.count_tokens("a" * 6) == 2
+        assert estimator.count_tokens("a" * 10) == 3
+        assert count_tokens("a" * 10) == 3
+
+    def test_matches_float_formula_for_any_ratio(self):
+        for chars in (3.0, 3.5, 4.0, 5.0):
+            estimator = TokenEstimator(TokenEstimatorConfig(chars_per_token=chars))
+            for n in range(1, 200):
+                assert estimator.count_tokens("a" * n) == max(1, int(n / chars + 0.5))
+
+
+class TestCountMessages:
+    """Tests for chat message estimates."""
+
+    def test_formatting_overhead_and_text(self):
+        estimator = TokenEstimator()
+        assert estimator.count_messages([]) == 0
+        messages = [
+            {"role": "user", "content": "a" * 12},
+            {"role": "assistant", "content": "b" * 15},
+        ]
+        # 3 per message + 3 final, and (4 + 12 + 9 + 15) / 4 chars of text
+        assert estimator.count_messages(messages) == 3 * 2 + 3 + 10
+
+    def test_role_tokens_match_text_estimate(self):
+        for chars in (3.5, 4.0):
+            estimator = TokenEstimator(TokenEstimatorConfig(chars_per_token=chars))
+            for role in ("system", "user", "assistant", "tool", "function"):
+                assert estimator.count_role_tokens(role) == estimator.count_tokens(role)
+
+
+class TestCountFileContent:
+    """Tests for file attachment estimates."""
+
+    def test_file_type_multipliers(self):
+        estimator = TokenEstimator()
+        content = "a" * 400
+        assert estimator.count_file_content("") == 0
+        assert estimator.count_file_content(content) == 100
+        assert estimator.count_file_content(content, "python") == 105
+        assert estimator.count_file_content(content, "json") == 102